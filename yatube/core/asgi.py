@@ -0,0 +1,172 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+
+_END = object()
+# Сколько кусков ответа ждут отправки клиенту, пока поток пула ждёт.
+STREAM_BUFFER = 16
+
+
+def build_environ(scope, body):
+    """WSGI-окружение для HTTP-запроса ASGI."""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode().decode('latin-1'),
+        'PATH_INFO': path.encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class ASGIBridge:
+    """ASGI-приложение поверх WSGI-приложения Django.
+
+    Django 2.2 не умеет ни ASGI, ни асинхронных представлений, поэтому
+    представления по-прежнему выполняются синхронно, но в ограниченном
+    пуле из `max_threads` потоков. Чтение тела запроса и отправка ответа
+    медленным клиентам идут в цикле событий и потоков не занимают: поток
+    освобождается, как только ответ готов. Потоковый ответ читается
+    в том же потоке до конца, через очередь на `STREAM_BUFFER` кусков.
+    Запуск: `uvicorn yatube.asgi:application`.
+    """
+
+    def __init__(self, wsgi_application, max_threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_workers=max_threads,
+                                           thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        body = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    def run_application(self, environ, loop, queue, cancelled):
+        """Выполняется в пуле: вызывает Django и передаёт ответ в `queue`.
+
+        В очередь попадают заголовки, куски тела и `_END`. Ответ, и
+        потоковый тоже, читается и закрывается целиком в этом потоке:
+        курсор `.iterator()` и сигнал `request_finished` относятся
+        к соединению с БД того потока, где работало представление.
+        Пока очередь полна, поток ждёт медленного клиента.
+        """
+        def put(item):
+            if not cancelled.is_set():
+                asyncio.run_coroutine_threadsafe(
+                    queue.put(item), loop).result()
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        try:
+            result = self.wsgi_application(environ, start_response)
+            try:
+                put(response)
+                if not getattr(result, 'streaming', False):
+                    put(b''.join(result))
+                    return
+                for chunk in result:
+                    if cancelled.is_set():
+                        break
+                    if chunk:
+                        put(chunk)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        finally:
+            put(_END)
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=STREAM_BUFFER)
+        cancelled = threading.Event()
+        worker = loop.run_in_executor(
+            self.executor, self.run_application,
+            build_environ(scope, body), loop, queue, cancelled)
+        try:
+            response = await queue.get()
+            if response is _END:
+                # Приложение упало до ответа: ошибку поднимет `worker`.
+                return
+            await send({'type': 'http.response.start',
+                        'status': response['status'],
+                        'headers': response['headers']})
+            chunk = await queue.get()
+            while chunk is not _END:
+                await send({'type': 'http.response.body',
+                            'body': chunk, 'more_body': True})
+                chunk = await queue.get()
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            # Клиент мог уйти: освобождаем поток, ждущий места в очереди.
+            cancelled.set()
+            while not queue.empty():
+                queue.get_nowait()
+            try:
+                await worker
+            finally:
+                body.close()
@@ -0,0 +1,66 @@
+import json
+import math
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(durations, queries=None, elapsed=None):
+    """Сводка по замерам в секундах: перцентили в мс и запросы в секунду."""
+    elapsed = elapsed if elapsed is not None else sum(durations)
+    summary = {
+        'requests': len(durations),
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 3)
+        if durations else 0.0,
+        'p50_ms': round(percentile(durations, 50) * 1000, 3),
+        'p95_ms': round(percentile(durations, 95) * 1000, 3),
+        'p99_ms': round(percentile(durations, 99) * 1000, 3),
+        'requests_per_second': round(len(durations) / elapsed, 1)
+        if elapsed else 0.0,
+    }
+    if queries is not None:
+        summary['queries_per_request'] = (
+            round(sum(queries) / len(queries), 2) if queries else 0.0)
+    return summary
+
+
+@contextmanager
+def test_database(verbosity=0):
+    """Временная база данных, как у тестов: рабочие данные не трогаются."""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity,
+                                       autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def write_report(report, path):
+    with open(path, 'w') as stream:
+        json.dump(report, stream, ensure_ascii=False, indent=2)
+
+
+def compare_reports(previous, current, metric='p95_ms', threshold=1.2):
+    """Сравнивает отчёты: список (имя, было, стало, регрессия ли)."""
+    rows = []
+    for name, result in current['results'].items():
+        before = previous.get('results', {}).get(name, {}).get(metric)
+        if not before:
+            continue
+        after = result[metric]
+        rows.append((name, before, after, after > before * threshold))
+    return rows
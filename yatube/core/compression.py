@@ -0,0 +1,45 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP = 'gzip'
+BROTLI = 'br'
+
+
+def available_encodings():
+    """Поддерживаемые кодировки в порядке предпочтения."""
+    if brotli is not None:
+        return (BROTLI, GZIP)
+    return (GZIP,)
+
+
+def make_compressor(encoding, level):
+    """Возвращает функции `(compress, flush, finish)` для потока данных.
+
+    `flush` выталкивает всё накопленное, не завершая поток, чтобы клиент
+    получал части ответа по мере их готовности.
+    """
+    if encoding == BROTLI:
+        compressor = brotli.Compressor(quality=level)
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (compressor.compress,
+            lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush)
+
+
+def compress(content, encoding, level):
+    compress_chunk, _, finish = make_compressor(encoding, level)
+    return compress_chunk(content) + finish()
+
+
+def compress_stream(chunks, encoding, level):
+    compress_chunk, flush, finish = make_compressor(encoding, level)
+    for chunk in chunks:
+        data = compress_chunk(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
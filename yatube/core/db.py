@@ -0,0 +1,14 @@
+from django.conf import settings
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Применяет `SQLITE_PRAGMAS` к каждому новому соединению с SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(settings.SQLITE_PRAGMAS):
+            cursor.execute(statement)
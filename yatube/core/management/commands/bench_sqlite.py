@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.benchmark import summarize, write_report
+from core.db import pragma_statements
+
+SCHEMA = [
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT NOT NULL, '
+    'pub_date REAL NOT NULL, author_id INTEGER NOT NULL)',
+    'CREATE INDEX post_pub_date ON post (pub_date, id)',
+    'CREATE INDEX post_author ON post (author_id, pub_date)',
+]
+READ_SQL = ('SELECT id, text FROM post WHERE author_id = ? '
+            'ORDER BY pub_date DESC LIMIT 10')
+WRITE_SQL = 'INSERT INTO post (text, pub_date, author_id) VALUES (?, ?, ?)'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность чтения SQLite во время '
+            'записи со стандартными настройками и с SQLITE_PRAGMAS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--output', help='куда сохранить отчёт JSON')
+
+    def handle(self, *args, **options):
+        report = {}
+        for mode, pragmas in (('default', {}),
+                              ('tuned', settings.SQLITE_PRAGMAS)):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, 'bench.sqlite3')
+                self.seed(path, options['rows'])
+                report[mode] = self.run(path, pragmas, options)
+            self.stdout.write(
+                f'{mode}: чтений {report[mode]["reads_per_second"]}/с '
+                f'(p95 {report[mode]["reads"]["p95_ms"]} мс), '
+                f'записей {report[mode]["writes_per_second"]}/с, '
+                f'ошибок блокировки {report[mode]["locked_errors"]}')
+        if options['output']:
+            write_report(report, options['output'])
+
+    def connect(self, path, pragmas):
+        connection = sqlite3.connect(path, isolation_level=None,
+                                     check_same_thread=False)
+        for statement in pragma_statements(pragmas):
+            connection.execute(statement)
+        return connection
+
+    def seed(self, path, rows):
+        connection = sqlite3.connect(path)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        now = time.time()
+        connection.executemany(WRITE_SQL, (
+            (f'Пост {number}', now - number, number % 100)
+            for number in range(rows)))
+        connection.commit()
+        connection.close()
+
+    def loop(self, path, pragmas, operation, stop, durations, errors):
+        """Повторяет `operation` до `stop`, собирая время и ошибки."""
+        connection = self.connect(path, pragmas)
+        local_durations = []
+        local_errors = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                operation(connection)
+            except sqlite3.OperationalError:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                local_errors += 1
+                continue
+            local_durations.append(time.perf_counter() - started)
+        connection.close()
+        # list.extend атомарен под GIL, отдельная блокировка не нужна.
+        durations.extend(local_durations)
+        errors.append(local_errors)
+
+    def run(self, path, pragmas, options):
+        stop = threading.Event()
+        reads, writes, errors = [], [], []
+
+        def read(connection, author_id):
+            connection.execute(READ_SQL, (author_id,)).fetchall()
+
+        def write(connection, author_id):
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                WRITE_SQL, ('Новый пост', time.time(), author_id))
+            connection.execute('COMMIT')
+
+        threads = []
+        for operation, count, durations in (
+                (read, options['readers'], reads),
+                (write, options['writers'], writes)):
+            for number in range(count):
+                threads.append(threading.Thread(target=self.loop, args=(
+                    path, pragmas, partial(operation, author_id=number % 100),
+                    stop, durations, errors)))
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        seconds = options['seconds']
+        return {
+            'pragmas': pragmas,
+            'reads': summarize(reads, elapsed=seconds),
+            'writes': summarize(writes, elapsed=seconds),
+            'reads_per_second': round(len(reads) / seconds, 1),
+            'writes_per_second': round(len(writes) / seconds, 1),
+            'locked_errors': sum(errors),
+        }
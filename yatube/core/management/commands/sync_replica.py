@@ -0,0 +1,37 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файл реплики через '
+            'backup API, не останавливая запись.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=1024,
+                            help='страниц за один шаг копирования')
+
+    def handle(self, *args, **options):
+        alias = settings.REPLICA_DATABASE_ALIAS
+        if alias not in connections.databases:
+            raise CommandError(
+                'Реплика не настроена: задайте YATUBE_REPLICA_DB.')
+        primary = connections.databases[DEFAULT_DB_ALIAS]
+        replica = connections.databases[alias]
+        if (primary['ENGINE'] != 'django.db.backends.sqlite3'
+                or replica['ENGINE'] != 'django.db.backends.sqlite3'):
+            raise CommandError('Копирование поддерживается только для SQLite.')
+        # Соединение реплики в этом процессе не должно держать файл.
+        connections[alias].close()
+        source = sqlite3.connect(primary['NAME'])
+        target = sqlite3.connect(replica['NAME'])
+        try:
+            with target:
+                source.backup(target, pages=options['pages'])
+        finally:
+            target.close()
+            source.close()
+        self.stdout.write(
+            f'Реплика {replica["NAME"]} обновлена из {primary["NAME"]}.')
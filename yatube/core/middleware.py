@@ -0,0 +1,389 @@
+import json
+import logging
+import mimetypes
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags
+from django.template.base import Template
+
+from . import routers
+from .compression import available_encodings, compress, compress_stream
+from .querylog import QueryInspector
+from .tasks import queue_stats
+
+logger = logging.getLogger('yatube.requests')
+
+_local = threading.local()
+
+
+def current_timing():
+    return getattr(_local, 'timing', None)
+
+
+class RequestTiming:
+    """Замеры одного запроса: SQL, шаблоны и общее время."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.queries = []
+        self.db_time = 0.0
+        self.db_time_in_templates = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries.append((duration, sql))
+            self.db_time += duration
+            if self.template_depth:
+                self.db_time_in_templates += duration
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    @property
+    def python_time(self):
+        template_time = self.template_time - self.db_time_in_templates
+        return max(self.total - self.db_time - template_time, 0.0)
+
+    def slowest_queries(self, count):
+        return sorted(self.queries, key=lambda query: query[0],
+                      reverse=True)[:count]
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{len(self.queries)} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'app;dur={self.python_time * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ))
+
+
+def instrument_templates():
+    """Подключает замер времени рендеринга к Template.render один раз."""
+    if getattr(Template.render, 'timed', False):
+        return
+    render = Template.render
+
+    def timed_render(self, context):
+        timing = current_timing()
+        if timing is None:
+            return render(self, context)
+        timing.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timing.template_depth -= 1
+            if not timing.template_depth:
+                timing.template_time += time.perf_counter() - started
+
+    timed_render.timed = True
+    Template.render = timed_render
+
+
+class RequestTimingMiddleware:
+    """Замеряет SQL, шаблоны и общее время выборки запросов.
+
+    Доля замеряемых запросов задаётся `REQUEST_TIMING_SAMPLE_RATE`.
+    Результат уходит в заголовок `Server-Timing` и в лог
+    `yatube.requests`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        self.slowest = settings.REQUEST_TIMING_SLOWEST_QUERIES
+        instrument_templates()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        timing = _local.timing = RequestTiming()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timing.execute))
+                response = self.get_response(request)
+        finally:
+            _local.timing = None
+        timing.finish()
+        response['Server-Timing'] = timing.server_timing()
+        self.log(request, response, timing)
+        return response
+
+    def log(self, request, response, timing):
+        slowest = [
+            {'ms': round(duration * 1000, 2), 'sql': sql[:300]}
+            for duration, sql in timing.slowest_queries(self.slowest)
+        ]
+        data = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(timing.total * 1000, 2),
+            'db_ms': round(timing.db_time * 1000, 2),
+            'queries': len(timing.queries),
+            'template_ms': round(timing.template_time * 1000, 2),
+            'python_ms': round(timing.python_time * 1000, 2),
+            'slowest_queries': slowest,
+            'task_queue': queue_stats(),
+        }
+        logger.info(
+            'method=%(method)s path=%(path)s status=%(status)s '
+            'total_ms=%(total_ms)s db_ms=%(db_ms)s queries=%(queries)s '
+            'template_ms=%(template_ms)s python_ms=%(python_ms)s',
+            data, extra={'timing': data})
+
+
+class QueryInspectorMiddleware:
+    """Пишет в лог `yatube.sql` медленные и повторяющиеся запросы.
+
+    Каждая находка содержит имя представления и строку шаблона
+    (или кода), из которой выполнен запрос.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.SLOW_QUERY_SAMPLE_RATE
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        inspector = QueryInspector()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(inspector))
+            response = self.get_response(request)
+        match = request.resolver_match
+        inspector.report(match.view_name if match else request.path)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Read-your-writes для `ReplicaRouter`.
+
+    Небезопасные запросы и запросы с cookie `REPLICA_PIN_COOKIE` читают
+    только с основной базы. После записи cookie выставляется на
+    `REPLICA_PIN_SECONDS`, чтобы редирект после POST не попал на
+    отстающую реплику.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unsafe = request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+        routers.start_request(
+            unsafe or settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.finish_request()
+        if wrote or unsafe:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+def accepted_encodings(request):
+    """Кодировки из `Accept-Encoding`, которые клиент принимает (q > 0)."""
+    accepted = set()
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        quality = 1.0
+        name, _, value = params.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding.strip() and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def etag_matches(header, etag):
+    """Слабое сравнение ETag из `If-None-Match` (RFC 7232, 2.3.2).
+
+    `CompressionMiddleware` ослабляет ETag файлов, которые сжимает сама,
+    поэтому клиент присылает его обратно с `W/`.
+    """
+    def opaque(tag):
+        return tag[2:] if tag.startswith('W/') else tag
+    tags = parse_etags(header)
+    return '*' in tags or opaque(etag) in map(opaque, tags)
+
+
+class StaticFile:
+    """Файл из STATIC_ROOT и его сжатые копии."""
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, path, immutable):
+        self.path = path
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in (
+                'application/javascript', 'application/json',
+                'image/svg+xml'):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        if immutable:
+            self.cache_control = 'public, max-age=31536000, immutable'
+        else:
+            self.cache_control = (
+                f'public, max-age={settings.STATIC_MAX_AGE}')
+        self.variants = {None: self.stat(path)}
+        for encoding, suffix in self.encodings:
+            if os.path.isfile(path + suffix):
+                self.variants[encoding] = self.stat(path + suffix)
+
+    @staticmethod
+    def stat(path):
+        stat = os.stat(path)
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        return path, stat.st_size, stat.st_mtime, etag
+
+    def choose(self, request):
+        if len(self.variants) > 1:
+            accepted = accepted_encodings(request)
+            for encoding, _ in self.encodings:
+                if encoding in self.variants and (
+                        encoding in accepted or '*' in accepted):
+                    return encoding, self.variants[encoding]
+        return None, self.variants[None]
+
+    def respond(self, request):
+        encoding, (path, size, mtime, etag) = self.choose(request)
+        if etag_matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag):
+            response = HttpResponseNotModified()
+        elif request.method == 'HEAD':
+            response = HttpResponse(content_type=self.content_type)
+            response['Content-Length'] = size
+        else:
+            response = FileResponse(open(path, 'rb'),
+                                    content_type=self.content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(mtime)
+        response['Cache-Control'] = self.cache_control
+        if len(self.variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику из STATIC_ROOT, минуя представления.
+
+    Файлы с хэшем содержимого в имени (из манифеста
+    `CompressedManifestStaticFilesStorage`) кэшируются клиентами навсегда,
+    остальные — на `STATIC_MAX_AGE` секунд. Сжатая копия выбирается по
+    `Accept-Encoding`. Список файлов читается при старте процесса, поэтому
+    после collectstatic процесс нужно перезапустить.
+    """
+
+    def __init__(self, get_response):
+        root = settings.STATIC_ROOT
+        if not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.files = self.scan(root, settings.STATIC_URL)
+
+    @staticmethod
+    def scan(root, prefix):
+        hashed = set()
+        manifest_path = os.path.join(root, 'staticfiles.json')
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as manifest:
+                hashed = set(json.load(manifest).get('paths', {}).values())
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                if path.endswith(('.gz', '.br')) and os.path.isfile(
+                        path[:-3]):
+                    continue
+                relative = os.path.relpath(path, root).replace(os.sep, '/')
+                files[prefix + relative] = StaticFile(path,
+                                                      relative in hashed)
+        return files
+
+    def __call__(self, request):
+        static_file = None
+        if request.method in ('GET', 'HEAD'):
+            static_file = self.files.get(request.path)
+        if static_file is None:
+            return self.get_response(request)
+        return static_file.respond(request)
+
+
+class CompressionMiddleware:
+    """Сжимает ответы gzip или brotli по `Accept-Encoding`.
+
+    Сжимаются только типы из `COMPRESSION_CONTENT_TYPES`; обычные ответы
+    короче `COMPRESSION_MIN_SIZE` байт отдаются как есть. Потоковые ответы
+    сжимаются по частям, не собирая тело в памяти.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if (response.has_header('Content-Encoding')
+                or content_type not in settings.COMPRESSION_CONTENT_TYPES):
+            return response
+        if (not response.streaming
+                and len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+        level = settings.COMPRESSION_LEVELS[encoding]
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding, level)
+            del response['Content-Length']
+        else:
+            content = compress(response.content, encoding, level)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # Сжатое тело отличается побайтно, но не по смыслу.
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def choose_encoding(request):
+        accepted = accepted_encodings(request)
+        for encoding in available_encodings():
+            if encoding in accepted or '*' in accepted:
+                return encoding
+        return None
@@ -0,0 +1,89 @@
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.template.base import Node
+
+logger = logging.getLogger('yatube.sql')
+
+# Модули самой диагностики не считаются местом выполнения запроса.
+SKIPPED_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ('querylog.py', 'middleware.py')
+}
+
+
+def find_location():
+    """Откуда выполнен запрос: строка шаблона или строка кода проекта."""
+    frame = sys._getframe(1)
+    code_location = None
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if (frame.f_code.co_name == 'render_annotated'
+                and isinstance(node, Node)
+                and getattr(node, 'token', None) is not None):
+            origin = getattr(node, 'origin', None)
+            name = origin.template_name if origin else None
+            return f'{name or "<template>"}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if (code_location is None
+                and filename.startswith(settings.BASE_DIR)
+                and filename not in SKIPPED_FILES):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            code_location = f'{path}:{frame.f_lineno}'
+        frame = frame.f_back
+    return code_location or '<unknown>'
+
+
+class QueryInspector:
+    """Ищет медленные и повторяющиеся SQL-запросы.
+
+    Подключается через `connection.execute_wrapper`. Одинаковый SQL,
+    выполненный `duplicate_threshold` раз за запрос, — признак N+1:
+    для него запоминается место, где случился пороговый повтор.
+    """
+
+    def __init__(self, slow_ms=None, duplicate_threshold=None):
+        if slow_ms is None:
+            slow_ms = settings.SLOW_QUERY_THRESHOLD_MS
+        if duplicate_threshold is None:
+            duplicate_threshold = settings.DUPLICATE_QUERY_THRESHOLD
+        self.slow_ms = slow_ms
+        self.duplicate_threshold = duplicate_threshold
+        self.counts = Counter()
+        self.duplicate_locations = {}
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.counts[sql] += 1
+            if self.counts[sql] == self.duplicate_threshold:
+                self.duplicate_locations[sql] = find_location()
+            if duration_ms >= self.slow_ms:
+                self.slow_queries.append((duration_ms, sql, find_location()))
+
+    @property
+    def duplicates(self):
+        return [(sql, self.counts[sql], location)
+                for sql, location in self.duplicate_locations.items()]
+
+    def report(self, view_name):
+        for duration_ms, sql, location in self.slow_queries:
+            logger.warning(
+                'slow query view=%s location=%s ms=%.1f sql=%s',
+                view_name, location, duration_ms, sql[:500],
+                extra={'view': view_name, 'location': location,
+                       'duration_ms': duration_ms, 'sql': sql})
+        for sql, count, location in self.duplicates:
+            logger.warning(
+                'duplicate query view=%s location=%s count=%d sql=%s',
+                view_name, location, count, sql[:500],
+                extra={'view': view_name, 'location': location,
+                       'count': count, 'sql': sql})
@@ -0,0 +1,92 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_local = threading.local()
+
+
+def start_request(pinned):
+    """Сбрасывает состояние потока в начале запроса."""
+    _local.pinned = pinned
+    _local.wrote = False
+    _local.replica_reads = False
+
+
+def finish_request():
+    """Возвращает True, если за время запроса была запись в БД."""
+    wrote = getattr(_local, 'wrote', False)
+    start_request(False)
+    return wrote
+
+
+def is_pinned():
+    """Читает ли текущий запрос только с основной базы (недавняя запись)."""
+    return getattr(_local, 'pinned', False)
+
+
+def replica_alias():
+    alias = settings.REPLICA_DATABASE_ALIAS
+    if alias in connections.databases:
+        return alias
+    return None
+
+
+@contextmanager
+def replica_reads(allowed=True):
+    """Разрешает читать с реплики внутри блока."""
+    previous = getattr(_local, 'replica_reads', False)
+    _local.replica_reads = allowed
+    try:
+        yield
+    finally:
+        _local.replica_reads = previous
+
+
+def primary_reads():
+    """Внутри блока все чтения идут в основную базу."""
+    return replica_reads(False)
+
+
+def use_replica(view_func):
+    """Декоратор представления: его чтения уходят на реплику."""
+    @wraps(view_func)
+    def wrapped_view(request, *args, **kwargs):
+        with replica_reads():
+            return view_func(request, *args, **kwargs)
+    return wrapped_view
+
+
+class ReplicaRouter:
+    """Отправляет чтения `REPLICA_MODELS` на реплику.
+
+    Только внутри представлений с `use_replica` и только пока запрос
+    не закреплён за основной базой: после записи в этом же запросе или
+    по cookie от недавнего POST (см. `ReplicaPinMiddleware`).
+    """
+
+    def db_for_read(self, model, **hints):
+        if (not getattr(_local, 'replica_reads', False)
+                or is_pinned()
+                or model._meta.label not in settings.REPLICA_MODELS):
+            return None
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        _local.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает на реплику вместе с копией файла основной базы.
+        if db == settings.REPLICA_DATABASE_ALIAS:
+            return False
+        return None
@@ -0,0 +1,63 @@
+import gzip
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def compress_file(path):
+    """Пишет рядом с `path` сжатые копии `.gz` и `.br`.
+
+    Копия сохраняется, только если она заметно меньше исходника.
+    Возвращает суффиксы созданных копий.
+    """
+    with open(path, 'rb') as source:
+        content = source.read()
+    if len(content) < settings.STATIC_COMPRESS_MIN_SIZE:
+        return []
+    variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content)))
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) >= len(content) * 0.95:
+            continue
+        with open(path + suffix, 'wb') as target:
+            target.write(compressed)
+        written.append(suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем содержимого в имени и сжатыми копиями рядом.
+
+    Если файла нет в манифесте (collectstatic ещё не запускали),
+    `{% static %}` отдаёт имя без хэша вместо ошибки.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed = set()
+        for name, hashed_name, result in super().post_process(
+                paths, dry_run, **options):
+            if hashed_name and not isinstance(result, Exception):
+                processed.update((name, hashed_name))
+            yield name, hashed_name, result
+        if dry_run:
+            return
+        for name in sorted(processed):
+            extension = os.path.splitext(name)[1].lstrip('.').lower()
+            if extension not in settings.STATIC_COMPRESS_EXTENSIONS:
+                continue
+            for suffix in compress_file(self.path(name)):
+                yield name + suffix, name + suffix, True
@@ -0,0 +1,155 @@
+import logging
+import queue
+import threading
+from collections import Counter
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger('yatube.tasks')
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+class TaskQueue:
+    """Очередь задач в памяти процесса с пулом рабочих потоков.
+
+    Упавшая задача повторяется до `retries` раз с экспоненциальной
+    задержкой `backoff * 2 ** attempt`. Задачи, не выполненные к
+    остановке процесса, теряются: в них должна быть только работа,
+    которую можно восстановить (счётчики пересчитывает
+    `recount_posts_counters`).
+    """
+
+    def __init__(self, workers):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        self.delayed = 0
+        self.running = 0
+        self.threads = [
+            threading.Thread(target=self.work, name=f'task-worker-{number}',
+                             daemon=True)
+            for number in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, task, args, kwargs, attempt=0):
+        self.queue.put((task, args, kwargs, attempt))
+        depth = self.queue.qsize()
+        if depth >= settings.TASKS_QUEUE_WARNING_DEPTH:
+            logger.warning('task queue depth=%s', depth,
+                           extra={'tasks': self.stats()})
+
+    def retry_later(self, task, args, kwargs, attempt):
+        delay = task.backoff * 2 ** attempt
+
+        def put():
+            with self.lock:
+                self.delayed -= 1
+            self.put(task, args, kwargs, attempt + 1)
+
+        timer = threading.Timer(delay, put)
+        timer.daemon = True
+        with self.lock:
+            self.delayed += 1
+            self.counters['retried'] += 1
+        timer.start()
+
+    def work(self):
+        while True:
+            task, args, kwargs, attempt = self.queue.get()
+            with self.lock:
+                self.running += 1
+            close_old_connections()
+            try:
+                task.func(*args, **kwargs)
+            except Exception:
+                if attempt < task.retries:
+                    logger.warning('task %s failed, attempt %s',
+                                   task.name, attempt + 1, exc_info=True)
+                    self.retry_later(task, args, kwargs, attempt)
+                else:
+                    logger.exception('task %s failed', task.name)
+                    with self.lock:
+                        self.counters['failed'] += 1
+            else:
+                with self.lock:
+                    self.counters['completed'] += 1
+            finally:
+                close_old_connections()
+                with self.lock:
+                    self.running -= 1
+                self.queue.task_done()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'depth': self.queue.qsize(),
+                'delayed': self.delayed,
+                'running': self.running,
+                'completed': self.counters['completed'],
+                'retried': self.counters['retried'],
+                'failed': self.counters['failed'],
+            }
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = TaskQueue(settings.TASKS_WORKERS)
+        return _queue
+
+
+def queue_stats():
+    """Метрики очереди; пустые, пока в неё ничего не ставили."""
+    if _queue is None:
+        return {}
+    return _queue.stats()
+
+
+def run_inline():
+    return connection.vendor == 'sqlite' and connection.is_in_memory_db()
+
+
+class Task:
+    def __init__(self, func, retries, backoff):
+        self.func = func
+        self.retries = retries
+        self.backoff = backoff
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Ставит задачу в очередь после фиксации текущей транзакции.
+
+        При `TASKS_EAGER` задача выполняется сразу, в текущем потоке.
+        Так же и с базой SQLite в памяти (тесты): рабочие потоки делили бы
+        её с текущим и упирались бы в блокировки таблиц.
+        """
+        if settings.TASKS_EAGER or run_inline():
+            self.func(*args, **kwargs)
+            return
+        transaction.on_commit(
+            lambda: get_queue().put(self, args, kwargs))
+
+
+def task(func=None, *, retries=None, backoff=None):
+    """Декоратор фоновой задачи: `func.delay(...)` ставит её в очередь."""
+    if retries is None:
+        retries = settings.TASKS_RETRIES
+    if backoff is None:
+        backoff = settings.TASKS_RETRY_BACKOFF
+
+    def decorator(func):
+        return Task(func, retries, backoff)
+    if func is not None:
+        return decorator(func)
+    return decorator
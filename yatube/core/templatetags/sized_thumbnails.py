@@ -0,0 +1,10 @@
+from django import template
+
+from core.thumbnails import get_sized_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def sized_thumbnail(image, size):
+    return get_sized_thumbnail(image, size)
@@ -0,0 +1,463 @@
+import asyncio
+import gzip
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import Context, Template
+from django.templatetags.static import static
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import (NoReverseMatch, clear_script_prefix, reverse,
+                         set_script_prefix)
+
+from core import routers
+from core.asgi import ASGIBridge
+from core.middleware import CompressionMiddleware, StaticFilesMiddleware
+from core.querylog import QueryInspector
+from core.reverse import fast_reverse
+from core.routers import ReplicaRouter
+from core.tasks import Task, TaskQueue
+
+from posts.models import Post, get_user_model
+
+
+User = get_user_model()
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+class RequestTimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author,
+                                       text='Тестовый пост')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_timing_is_sent_in_header_and_log(self):
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            response = self.author_client.get(
+                reverse('posts:post_detail', args=[self.post.id]))
+        for metric in ('db;dur=', 'tpl;dur=', 'app;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, response['Server-Timing'])
+        self.assertIn('queries"', response['Server-Timing'])
+        record, = logs.records
+        self.assertEqual(record.timing['status'], 200)
+        self.assertGreater(record.timing['queries'], 0)
+        self.assertGreater(record.timing['template_ms'], 0)
+        self.assertTrue(record.timing['slowest_queries'])
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_timed(self):
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class QueryInspectorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for number in range(6):
+            author = User.objects.create_user(username=f'user_{number}')
+            Post.objects.create(author=author, text='Тестовый пост')
+
+    def test_repeated_queries_are_reported_with_template_line(self):
+        template = Template(
+            '{% for post in posts %}\n'
+            '{{ post.author.username }}\n'
+            '{% endfor %}')
+        inspector = QueryInspector(slow_ms=1000, duplicate_threshold=5)
+        with connection.execute_wrapper(inspector):
+            template.render(Context({'posts': Post.objects.all()}))
+        (sql, count, location), = inspector.duplicates
+        self.assertIn('auth_user', sql)
+        self.assertEqual(count, 6)
+        self.assertEqual(location, '<template>:2')
+        with self.assertLogs('yatube.sql', 'WARNING') as logs:
+            inspector.report('posts:index')
+        self.assertIn('duplicate query view=posts:index '
+                      'location=<template>:2 count=6', logs.output[0])
+
+    @override_settings(SLOW_QUERY_SAMPLE_RATE=1, SLOW_QUERY_THRESHOLD_MS=0)
+    def test_middleware_inspects_sampled_requests(self):
+        cache.clear()
+        with self.assertLogs('yatube.sql', 'WARNING') as logs:
+            Client().get(reverse('posts:index'))
+        self.assertIn('slow query view=posts:index', logs.output[0])
+
+    @override_settings(SLOW_QUERY_SAMPLE_RATE=0, SLOW_QUERY_THRESHOLD_MS=0)
+    def test_middleware_skips_unsampled_requests(self):
+        cache.clear()
+        with self.assertNoLogs('yatube.sql', 'WARNING'):
+            Client().get(reverse('posts:index'))
+
+    def test_slow_queries_are_reported_with_code_line(self):
+        inspector = QueryInspector(slow_ms=0, duplicate_threshold=5)
+        with connection.execute_wrapper(inspector):
+            list(Post.objects.all())
+        (_, sql, location), = inspector.slow_queries
+        self.assertIn('posts_post', sql)
+        self.assertTrue(location.startswith('core/tests.py:'), location)
+
+
+class SQLitePragmasTest(TestCase):
+    def test_pragmas_are_applied_to_connection(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            busy_timeout = cursor.fetchone()[0]
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+        self.assertEqual(busy_timeout,
+                         settings.SQLITE_PRAGMAS['busy_timeout'])
+        # 1 — это NORMAL.
+        self.assertEqual(synchronous, 1)
+
+
+@mock.patch.dict(connections.databases, {'replica': {}})
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        routers.start_request(False)
+
+    def tearDown(self):
+        routers.finish_request()
+
+    def test_reads_go_to_replica_only_inside_marked_views(self):
+        self.assertIsNone(self.router.db_for_read(Post))
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.assertEqual(self.router.db_for_read(User), 'replica')
+            self.assertIsNone(self.router.db_for_read(Session))
+
+    def test_write_pins_request_to_primary(self):
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertIsNone(self.router.db_for_read(Post))
+        self.assertTrue(routers.finish_request())
+
+    def test_replica_is_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+class ReplicaPinMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_write_sets_pin_cookie(self):
+        response = self.author_client.post(reverse('posts:post_create'),
+                                           {'text': 'Новый пост'})
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+    def test_read_does_not_set_pin_cookie(self):
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+
+class TaskQueueTest(SimpleTestCase):
+    def run_task(self, func, retries):
+        task_queue = TaskQueue(workers=1)
+        task_queue.put(Task(func, retries=retries, backoff=0.01), (), {})
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            stats = task_queue.stats()
+            if stats['completed'] or stats['failed']:
+                return stats
+            time.sleep(0.01)
+        self.fail('Задача не завершилась')
+
+    def test_failed_task_is_retried_with_backoff(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(time.monotonic())
+            if len(attempts) < 3:
+                raise ValueError
+
+        with self.assertLogs('yatube.tasks', 'WARNING'):
+            stats = self.run_task(flaky, retries=3)
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['retried'], 2)
+        self.assertGreaterEqual(attempts[2] - attempts[1], 0.02)
+
+    def test_task_gives_up_after_retries(self):
+        def broken():
+            raise ValueError
+
+        with self.assertLogs('yatube.tasks', 'ERROR'):
+            stats = self.run_task(broken, retries=1)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['retried'], 1)
+        self.assertEqual(stats['depth'], 0)
+
+
+class StaticFilesPipelineTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            STATIC_ROOT=cls.static_root)
+        cls.settings_override.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.middleware = StaticFilesMiddleware(lambda request: None)
+        cls.css_url = static('css/bootstrap.min.css')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.static_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, url, **headers):
+        return self.middleware(RequestFactory().get(url, **headers))
+
+    def test_collected_files_are_hashed_and_compressed(self):
+        self.assertRegex(self.css_url,
+                         r'^/static/css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.static_root,
+                            self.css_url[len(settings.STATIC_URL):])
+        self.assertLess(os.path.getsize(path + '.gz'),
+                        os.path.getsize(path))
+
+    def test_hashed_file_is_cached_forever_and_negotiated(self):
+        response = self.get(self.css_url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        identity = self.get(self.css_url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertGreater(int(identity['Content-Length']),
+                           int(response['Content-Length']))
+        not_modified = self.get(self.css_url, HTTP_ACCEPT_ENCODING='gzip',
+                                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_file_compressed_on_the_fly_answers_not_modified(self):
+        path = os.path.join(self.static_root, 'plain.txt')
+        with open(path, 'w') as stream:
+            stream.write('Текст поста. ' * 200)
+        self.addCleanup(os.remove, path)
+        middleware = CompressionMiddleware(
+            StaticFilesMiddleware(lambda request: None))
+        response = middleware(RequestFactory().get(
+            '/static/plain.txt', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        not_modified = middleware(RequestFactory().get(
+            '/static/plain.txt', HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag']))
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_unhashed_file_is_cached_briefly(self):
+        response = self.get('/static/img/logo.png')
+        self.assertEqual(response['Cache-Control'],
+                         f'public, max-age={settings.STATIC_MAX_AGE}')
+
+    def test_other_paths_go_to_views(self):
+        self.assertIsNone(self.get('/static/missing.css'))
+        self.assertIsNone(self.get('/'))
+
+
+class CompressionMiddlewareTest(SimpleTestCase):
+    body = 'Текст поста. ' * 100
+
+    def run_middleware(self, response, encoding='gzip, deflate'):
+        request = RequestFactory().get('/',
+                                       HTTP_ACCEPT_ENCODING=encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_html_is_compressed(self):
+        response = HttpResponse(self.body)
+        response['ETag'] = '"feed"'
+        response = self.run_middleware(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"feed"')
+        self.assertEqual(gzip.decompress(response.content).decode(),
+                         self.body)
+        self.assertEqual(int(response['Content-Length']),
+                         len(response.content))
+
+    def test_small_and_unaccepted_responses_are_left_alone(self):
+        for response, encoding in ((HttpResponse('Мало'), 'gzip'),
+                                   (HttpResponse(self.body), 'identity'),
+                                   (HttpResponse(self.body,
+                                                 content_type='image/png'),
+                                    'gzip')):
+            with self.subTest(encoding=encoding):
+                response = self.run_middleware(response, encoding)
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_response_is_compressed_incrementally(self):
+        chunks = [f'{number},{self.body}\n'.encode()
+                  for number in range(10)]
+        response = self.run_middleware(StreamingHttpResponse(
+            iter(chunks), content_type='text/csv'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        parts = list(response.streaming_content)
+        self.assertGreater(len(parts), 1)
+        self.assertEqual(gzip.decompress(b''.join(parts)), b''.join(chunks))
+
+
+class ASGIBridgeTest(SimpleTestCase):
+    def call(self, application, scope, messages):
+        sent = []
+        messages = list(messages)
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'query_string': b'',
+                 'headers': [(b'host', b'testserver')], **scope}
+        asyncio.run(application(scope, receive, send))
+        return sent
+
+    def test_django_page_is_served(self):
+        bridge = ASGIBridge(get_wsgi_application(), 2)
+        sent = self.call(bridge, {'path': reverse('about:author')},
+                         [{'type': 'http.request'}])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      sent[0]['headers'])
+        self.assertIn(b'</html>', sent[1]['body'])
+
+    def test_request_is_translated_to_environ(self):
+        def echo(environ, start_response):
+            start_response('201 Created', [('X-Path', environ['PATH_INFO'])])
+            return [environ['wsgi.input'].read(),
+                    environ['QUERY_STRING'].encode(),
+                    environ['HTTP_X_TAG'].encode()]
+
+        sent = self.call(ASGIBridge(echo, 1), {
+            'method': 'POST', 'path': '/app/posts/', 'root_path': '/app',
+            'query_string': b'q=1',
+            'headers': [(b'x-tag', b'a'), (b'x-tag', b'b')],
+        }, [{'type': 'http.request', 'body': b'te', 'more_body': True},
+            {'type': 'http.request', 'body': b'xt'}])
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertEqual(sent[0]['headers'], [(b'x-path', b'/posts/')])
+        self.assertEqual(sent[1]['body'], b'textq=1a,b')
+
+    def test_streaming_response_is_sent_in_chunks(self):
+        response = StreamingHttpResponse(iter([b'one', b'two']))
+
+        def stream(environ, start_response):
+            start_response('200 OK', [])
+            return response
+
+        sent = self.call(ASGIBridge(stream, 1), {'path': '/'},
+                         [{'type': 'http.request'}])
+        self.assertEqual([message.get('body') for message in sent[1:]],
+                         [b'one', b'two', b''])
+        self.assertTrue(sent[1]['more_body'])
+
+    def test_streaming_response_is_consumed_in_view_thread(self):
+        threads = []
+
+        def chunks():
+            for chunk in (b'one', b'two', b'three'):
+                threads.append(threading.get_ident())
+                yield chunk
+
+        response = StreamingHttpResponse(chunks())
+        response.close = lambda: threads.append(threading.get_ident())
+
+        def stream(environ, start_response):
+            threads.append(threading.get_ident())
+            start_response('200 OK', [])
+            return response
+
+        sent = self.call(ASGIBridge(stream, 4), {'path': '/'},
+                         [{'type': 'http.request'}])
+        self.assertEqual(b''.join(message.get('body', b'')
+                                  for message in sent[1:]),
+                         b'onetwothree')
+        self.assertEqual(len(threads), 5)
+        self.assertEqual(len(set(threads)), 1)
+
+    def test_disconnect_stops_streaming(self):
+        closed = []
+        response = StreamingHttpResponse(
+            str(i).encode() for i in itertools.count())
+        response.close = lambda: closed.append(True)
+
+        def stream(environ, start_response):
+            start_response('200 OK', [])
+            return response
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                raise OSError('клиент ушёл')
+
+        async def receive():
+            return {'type': 'http.request'}
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/',
+                 'query_string': b'', 'headers': []}
+        with self.assertRaises(OSError):
+            asyncio.run(ASGIBridge(stream, 1)(scope, receive, send))
+        self.assertEqual(closed, [True])
+
+
+class FastReverseTest(SimpleTestCase):
+    routes = (
+        ('posts:index', ()),
+        ('posts:group_list', ('test-slug',)),
+        ('posts:profile', ('auth',)),
+        ('posts:profile', ('имя с пробелом?и#знаки%',)),
+        ('posts:post_detail', (42,)),
+        ('posts:post_edit', (7,)),
+        ('password_change', ()),
+        ('about:tech', ()),
+    )
+
+    def tearDown(self):
+        clear_script_prefix()
+
+    def test_matches_reverse(self):
+        for prefix in ('/', '/yatube/'):
+            set_script_prefix(prefix)
+            for viewname, args in self.routes:
+                with self.subTest(prefix=prefix, viewname=viewname,
+                                  args=args):
+                    self.assertEqual(fast_reverse(viewname, *args),
+                                     reverse(viewname, args=args))
+
+    def test_unknown_route_raises_like_reverse(self):
+        with self.assertRaises(NoReverseMatch):
+            fast_reverse('posts:nonexistent')
+        with self.assertRaises(NoReverseMatch):
+            fast_reverse('posts:post_detail')
+
+    def test_template_tag_escapes_url(self):
+        template = Template(
+            "{% load fast_urls %}{% fast_url 'posts:profile' name %}")
+        self.assertEqual(template.render(Context({'name': 'a&b'})),
+                         '/profile/a&amp;b/')
@@ -0,0 +1,18 @@
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+
+
+def get_sized_thumbnail(image, size):
+    """Миниатюра `image` размера `size` из `THUMBNAIL_SIZES`.
+
+    Если миниатюра ещё не создана, она создаётся сразу: это запасной путь
+    на случай, когда фоновая задача не успела.
+    """
+    geometry, options = settings.THUMBNAIL_SIZES[size]
+    return get_thumbnail(image, geometry, **options)
+
+
+def generate_thumbnails(image):
+    """Создаёт все миниатюры `image`, которые показывают шаблоны."""
+    for size in settings.THUMBNAIL_SIZES:
+        get_sized_thumbnail(image, size)
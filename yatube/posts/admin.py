@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Post, Group
+from .search import filter_matching, search_available
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +11,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or not search_available():
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        return filter_matching(queryset, search_term), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,160 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+
+from core.routers import primary_reads
+
+from .models import Group, Post, User
+
+
+# Версия списка групп хранится так же, как версии лент.
+GROUPS = 'groups'
+
+# Группы, загруженные в этот процесс: (версия, по id, по slug).
+_groups = (None, {}, {})
+
+
+def index_feed():
+    return 'index'
+
+
+def group_feed(slug):
+    return f'group:{slug}'
+
+
+def author_feed(username):
+    return f'author:{username}'
+
+
+def version_key(feed):
+    # Слаги и имена пользователей бывают не ASCII: memcached такие ключи
+    # не принимает.
+    return f'feed-version:{hashlib.md5(feed.encode()).hexdigest()}'
+
+
+def get_feed_versions(feeds):
+    """Версии лент. Версия — время последнего изменения ленты в мс."""
+    keys = [version_key(feed) for feed in feeds]
+    versions = cache.get_many(keys)
+    missing = {key: int(time.time() * 1000)
+               for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_feed_versions(*feeds):
+    """Сбрасывает закэшированные страницы перечисленных лент."""
+    keys = [version_key(feed) for feed in set(feeds)]
+    now = int(time.time() * 1000)
+    versions = cache.get_many(keys)
+    cache.set_many(
+        {key: max(now, versions.get(key, 0) + 1) for key in keys}, None)
+
+
+def cache_feed(*feed_funcs):
+    """Кэширует страницу ленты для анонимных посетителей.
+
+    `feed_funcs` получают именованные аргументы представления и возвращают
+    имена лент, от которых зависит страница. Ключ кэша включает версии
+    этих лент, поэтому `bump_feed_versions` сбрасывает только их страницы.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            feeds = [feed_func(**kwargs) for feed_func in feed_funcs]
+            feed_versions = get_feed_versions(feeds)
+            versions = '.'.join(map(str, feed_versions))
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f'feed-page:{versions}:{path}'
+            response = cache.get(key)
+            if response is None:
+                changed_ms = time.time() * 1000 - max(feed_versions)
+                if changed_ms < settings.REPLICA_PIN_SECONDS * 1000:
+                    # Реплика может ещё не знать об изменении, а страница
+                    # попадёт в кэш под новой версией ленты.
+                    with primary_reads():
+                        response = view(request, *args, **kwargs)
+                else:
+                    response = view(request, *args, **kwargs)
+                if (response.status_code == 200
+                        and not response.streaming):
+                    cache.set(key, response, settings.FEED_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def get_groups():
+    """Все группы из памяти процесса: `(по id, по slug)`.
+
+    Групп мало, и меняются они редко, поэтому они загружаются одним
+    запросом и перечитываются, только когда версия `GROUPS` в общем кэше
+    отличается от загруженной. Её меняют только сохранение и удаление
+    группы. Счётчик постов меняется с каждым постом, поэтому в памяти
+    его нет: он читается из строки группы (`get_group_posts_count`).
+    """
+    global _groups
+    version, = get_feed_versions([GROUPS])
+    loaded_version, by_id, by_slug = _groups
+    if version != loaded_version:
+        # Читаем с основной базы: реплика может ещё не знать о группе.
+        groups = list(Group.objects.using(DEFAULT_DB_ALIAS).defer(
+            'posts_count'))
+        by_id = {group.pk: group for group in groups}
+        by_slug = {group.slug: group for group in groups}
+        _groups = (version, by_id, by_slug)
+    return by_id, by_slug
+
+
+def get_group_or_404(slug):
+    group = get_groups()[1].get(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    return group
+
+
+def attach_groups(posts):
+    """Проставляет постам группы из памяти процесса вместо JOIN."""
+    by_id = get_groups()[0]
+    for post in posts:
+        group = by_id.get(post.group_id)
+        if group is not None:
+            post.group = group
+
+
+def invalidate_post_feeds(author_ids, group_ids):
+    """Сбрасывает кэш лент, в которых показывается пост."""
+    feeds = [index_feed()]
+    feeds += [author_feed(username) for username in User.objects.filter(
+        pk__in=author_ids).values_list('username', flat=True)]
+    by_id = get_groups()[0]
+    feeds += [group_feed(by_id[group_id].slug)
+              for group_id in group_ids if group_id in by_id]
+    bump_feed_versions(*feeds)
+
+
+def author_group_feeds(author_id):
+    """Ленты групп, в которых есть посты автора."""
+    by_id = get_groups()[0]
+    group_ids = Post.objects.filter(
+        author_id=author_id, group__isnull=False,
+    ).order_by().values_list('group_id', flat=True).distinct()
+    return [group_feed(by_id[group_id].slug)
+            for group_id in group_ids if group_id in by_id]
+
+
+def group_author_feeds(group_id):
+    """Ленты авторов, у которых есть посты в группе."""
+    usernames = User.objects.filter(
+        posts__group_id=group_id).values_list('username', flat=True)
+    return [author_feed(username) for username in usernames.distinct()]
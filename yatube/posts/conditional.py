@@ -0,0 +1,79 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.views.decorators.http import condition
+
+from .cache import author_feed, get_feed_versions, group_feed
+from .models import Post
+
+
+def make_etag(request, *parts):
+    # Страница зависит от пользователя (шапка сайта), поэтому он
+    # тоже входит в валидатор.
+    parts += (request.user.pk, request.get_full_path())
+    value = ':'.join(map(str, parts))
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def from_version(version):
+    return datetime.fromtimestamp(version / 1000, tz=timezone.utc)
+
+
+def feed_condition(*feed_funcs):
+    """Отвечает 304 на условный GET к ленте, не выполняя представление.
+
+    Валидаторы берутся из версий лент (см. `posts.cache`), поэтому их
+    проверка не обращается к базе данных.
+    """
+    def get_versions(request, **kwargs):
+        if not hasattr(request, '_feed_versions'):
+            request._feed_versions = get_feed_versions(
+                [feed_func(**kwargs) for feed_func in feed_funcs])
+        return request._feed_versions
+
+    def etag(request, *args, **kwargs):
+        return make_etag(request, *get_versions(request, **kwargs))
+
+    def last_modified(request, *args, **kwargs):
+        return from_version(max(get_versions(request, **kwargs)))
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def get_post_state(request, post_id):
+    """Дата изменения поста и версии лент автора и группы.
+
+    Лента автора меняется вместе с числом его постов и именем, лента
+    группы — при переименовании группы, которую показывает страница.
+    """
+    if not hasattr(request, '_post_state'):
+        state = Post.objects.filter(pk=post_id).values_list(
+            'modified', 'author__username', 'group__slug').first()
+        if state is not None:
+            modified, username, slug = state
+            feeds = [author_feed(username)]
+            if slug is not None:
+                feeds.append(group_feed(slug))
+            state = modified, get_feed_versions(feeds)
+        request._post_state = state
+    return request._post_state
+
+
+def post_etag(request, post_id):
+    state = get_post_state(request, post_id)
+    if state is None:
+        return None
+    modified, versions = state
+    return make_etag(request, modified.isoformat(), *versions)
+
+
+def post_last_modified(request, post_id):
+    state = get_post_state(request, post_id)
+    if state is None:
+        return None
+    modified, versions = state
+    return max(modified, from_version(max(versions)))
+
+
+post_condition = condition(etag_func=post_etag,
+                           last_modified_func=post_last_modified)
@@ -0,0 +1,118 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import AuthorStats, Follow, Group, Post
+
+
+def recount_author_counters(author_id):
+    """Заново считает посты и подписчиков автора.
+
+    Значения не сдвигаются на дельту, а считаются по исходным таблицам,
+    поэтому повторный или запоздавший вызов счётчики не портит.
+    """
+    AuthorStats.objects.update_or_create(
+        author_id=author_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=author_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=author_id).count(),
+        },
+    )
+
+
+def get_author_followers_count(author):
+    try:
+        return author.post_stats.followers_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+def recount_group_posts_count(group_id):
+    Group.objects.filter(pk=group_id).update(
+        posts_count=Post.objects.filter(group_id=group_id).count())
+
+
+def get_group_posts_count(group):
+    """Число постов группы из её строки, а не из группы в памяти процесса."""
+    count = Group.objects.filter(pk=group.pk).values_list(
+        'posts_count', flat=True).first()
+    return count or 0
+
+
+def get_author_posts_count(author):
+    """Число постов автора из счётчика, без COUNT(*) по постам."""
+    try:
+        return author.post_stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+TOTAL_POSTS_KEY = 'posts-total-count'
+
+
+def count_all_posts():
+    """Считает все посты и запоминает число в кэше со временем подсчёта."""
+    count = Post.objects.count()
+    cache.set(TOTAL_POSTS_KEY, (count, time.time()), None)
+    cache.delete(TOTAL_POSTS_KEY + ':refresh')
+    return count
+
+
+def get_total_posts_count():
+    """Число всех постов для пагинатора главной без COUNT(*) на запрос.
+
+    Значение берётся из кэша; если оно старше `POSTS_COUNT_MAX_AGE`
+    секунд, пересчёт ставится в фоновую очередь (один на всех), а пока
+    отдаётся прежнее. Если постов меньше `POSTS_EXACT_COUNT_BELOW`,
+    возвращает None: такие таблицы дешевле посчитать точно. Без значения
+    в кэше считает сразу.
+    """
+    cached = cache.get(TOTAL_POSTS_KEY)
+    if cached is None:
+        return count_all_posts()
+    count, counted_at = cached
+    # Пересчитываем и малые значения: таблица может вырасти за порог.
+    if (time.time() - counted_at > settings.POSTS_COUNT_MAX_AGE
+            and cache.add(TOTAL_POSTS_KEY + ':refresh', True,
+                          settings.POSTS_COUNT_MAX_AGE)):
+        # Импорт здесь: задачи сами используют функции этого модуля.
+        from .tasks import refresh_total_posts_count
+        refresh_total_posts_count.delay()
+    if count < settings.POSTS_EXACT_COUNT_BELOW:
+        return None
+    return count
+
+
+def recount_posts_counters():
+    """Пересчитывает счётчики постов и подписчиков по исходным таблицам."""
+    posts = Post.objects.order_by()
+    group_counts = dict(posts.filter(group__isnull=False).values_list(
+        'group').annotate(count=Count('pk')))
+    for group in Group.objects.only('pk', 'posts_count'):
+        count = group_counts.get(group.pk, 0)
+        if group.posts_count != count:
+            Group.objects.filter(pk=group.pk).update(posts_count=count)
+    post_counts = dict(posts.values_list('author').annotate(
+        count=Count('pk')))
+    follower_counts = dict(Follow.objects.order_by().values_list(
+        'author').annotate(count=Count('pk')))
+    author_ids = set(post_counts) | set(follower_counts)
+    AuthorStats.objects.exclude(author_id__in=author_ids).delete()
+    existing = {
+        author_id: counts for author_id, *counts in
+        AuthorStats.objects.values_list('author_id', 'posts_count',
+                                        'followers_count')
+    }
+    for author_id in author_ids:
+        counts = [post_counts.get(author_id, 0),
+                  follower_counts.get(author_id, 0)]
+        if author_id not in existing:
+            AuthorStats.objects.create(author_id=author_id,
+                                       posts_count=counts[0],
+                                       followers_count=counts[1])
+        elif existing[author_id] != counts:
+            AuthorStats.objects.filter(author_id=author_id).update(
+                posts_count=counts[0], followers_count=counts[1])
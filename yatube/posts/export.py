@@ -0,0 +1,106 @@
+import csv
+import datetime as dt
+import json
+import zlib
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Post
+
+EXPORT_FIELDS = ('id', 'text', 'pub_date', 'author', 'group')
+EXPORT_FORMATS = ('jsonl', 'csv')
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+def parse_moment(value):
+    """Дата или дата и время из параметра фильтра."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value!r}')
+        moment = dt.datetime.combine(day, dt.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(author=None, group=None, since=None, until=None):
+    """Посты для выгрузки: `since` включительно, `until` не включительно."""
+    posts = Post.objects.order_by('pk')
+    if author:
+        posts = posts.filter(author__username=author)
+    if group:
+        posts = posts.filter(group__slug=group)
+    if since:
+        posts = posts.filter(pub_date__gte=parse_moment(since))
+    if until:
+        posts = posts.filter(pub_date__lt=parse_moment(until))
+    return posts.values_list('pk', 'text', 'pub_date', 'author__username',
+                             'group__slug')
+
+
+def iter_rows(queryset, chunk_size=CHUNK_SIZE):
+    for values in queryset.iterator(chunk_size=chunk_size):
+        row = dict(zip(EXPORT_FIELDS, values))
+        row['pub_date'] = row['pub_date'].isoformat()
+        yield row
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Файлоподобный объект, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.DictWriter(Echo(), fieldnames=EXPORT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_buffered(chunks, size=BUFFER_SIZE):
+    """Склеивает мелкие куски в блоки около `size` байт."""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        chunk = chunk.encode()
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def iter_gzip(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_posts(export_format='jsonl', compress=False,
+                 chunk_size=CHUNK_SIZE, **filters):
+    """Поток байтов выгрузки постов; память не зависит от размера таблицы."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Неизвестный формат: {export_format!r}')
+    rows = iter_rows(export_queryset(**filters), chunk_size)
+    serialize = iter_csv if export_format == 'csv' else iter_jsonl
+    chunks = iter_buffered(serialize(rows))
+    if compress:
+        chunks = iter_gzip(chunks)
+    return chunks
@@ -7,9 +7,10 @@ class PostForm(forms.ModelForm):
 
     class Meta:
         model = Post
-        fields = ('group', 'text')
+        fields = ('group', 'text', 'image')
 
         help_texts = {
             'text': 'Текст нового поста',
             'group': 'Группа, к которой будет относится пост',
+            'image': 'Картинка к посту',
         }
@@ -0,0 +1,117 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import ASGIBridge, build_environ
+from core.benchmark import summarize, test_database, write_report
+
+from .bench_feeds import Command as BenchFeedsCommand
+
+VIEWS = ('index', 'group_list', 'profile', 'post_detail')
+
+
+def http_scope(url):
+    path, _, query = url.partition('?')
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+class Command(BenchFeedsCommand):
+    help = ('Сравнивает WSGI и ASGI-вход при множестве медленных клиентов: '
+            'в WSGI поток занят, пока клиент читает ответ.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--clients', type=int, default=200,
+                            help='одновременных клиентов')
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='всего запросов в каждом режиме')
+        parser.add_argument('--threads', type=int, default=16,
+                            help='потоков WSGI-сервера и пула ASGI')
+        parser.add_argument('--client-delay', type=float, default=100,
+                            help='сколько мс клиент читает ответ')
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='куда сохранить отчёт JSON')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.delay = options['client_delay'] / 1000
+        with test_database():
+            self.seed(options)
+            self.wsgi_application = get_wsgi_application()
+            self.urls = [self.addresses(view, options)
+                         for view in VIEWS]
+            results = {
+                'wsgi': asyncio.run(self.run(self.wsgi_request, options)),
+                'asgi': asyncio.run(self.run(self.asgi_request, options)),
+            }
+        self.stdout.write(
+            f'{"режим":<8}{"p50 мс":>10}{"p95 мс":>10}{"p99 мс":>10}'
+            f'{"RPS":>10}')
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:<8}{result["p50_ms"]:>10.1f}{result["p95_ms"]:>10.1f}'
+                f'{result["p99_ms"]:>10.1f}'
+                f'{result["requests_per_second"]:>10.1f}')
+        if options['output']:
+            write_report(results, options['output'])
+
+    def next_url(self):
+        return self.random.choice(self.urls)()
+
+    async def wsgi_request(self, url):
+        """Синхронный воркер: поток занят и отправкой ответа клиенту."""
+        def handle():
+            environ = build_environ(http_scope(url), BytesIO())
+            response = self.wsgi_application(environ, lambda *args: None)
+            b''.join(response)
+            response.close()
+            time.sleep(self.delay)
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, handle)
+
+    async def asgi_request(self, url):
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                await asyncio.sleep(self.delay)
+
+        await self.bridge(http_scope(url), receive, send)
+
+    async def run(self, make_request, options):
+        self.executor = ThreadPoolExecutor(max_workers=options['threads'])
+        self.bridge = ASGIBridge(self.wsgi_application, options['threads'])
+        remaining = options['requests']
+        durations = []
+
+        async def client():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                await make_request(self.next_url())
+                durations.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['clients'])))
+        elapsed = time.perf_counter() - started
+        self.executor.shutdown()
+        self.bridge.executor.shutdown()
+        return summarize(durations, elapsed=elapsed)
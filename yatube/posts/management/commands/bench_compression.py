@@ -0,0 +1,89 @@
+import random
+import time
+
+from django.test import Client
+
+from core.benchmark import summarize, test_database, write_report
+from core.compression import BROTLI, GZIP, available_encodings, compress
+
+from .bench_feeds import Command as BenchFeedsCommand
+
+PAGES = ('index', 'group_list', 'profile', 'post_detail')
+
+
+class Command(BenchFeedsCommand):
+    help = ('Сравнивает, сколько байт экономит сжатие страниц лент и '
+            'сколько процессорного времени оно стоит на каждом уровне.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='сколько раз сжимать каждую страницу')
+        parser.add_argument('--gzip-levels', nargs='+', type=int,
+                            default=[1, 6, 9])
+        parser.add_argument('--brotli-levels', nargs='+', type=int,
+                            default=[1, 5, 11])
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='куда сохранить отчёт JSON')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        with test_database():
+            self.seed(options)
+            pages = self.render_pages()
+        variants = [(GZIP, level) for level in options['gzip_levels']]
+        if BROTLI in available_encodings():
+            variants += [(BROTLI, level)
+                         for level in options['brotli_levels']]
+        else:
+            self.stdout.write('brotli не установлен, сравниваем только gzip.')
+        results = [
+            self.measure(view, content, encoding, level, options['repeat'])
+            for view, content in pages.items()
+            for encoding, level in variants
+        ]
+        self.print_results(results)
+        if options['output']:
+            write_report({'results': results}, options['output'])
+
+    def render_pages(self):
+        client = Client()
+        pages = {}
+        for view in PAGES:
+            url = self.addresses(view, {'pages': 1})()
+            pages[view] = client.get(url).content
+        return pages
+
+    def measure(self, view, content, encoding, level, repeat):
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            compressed = compress(content, encoding, level)
+            durations.append(time.perf_counter() - started)
+        timing = summarize(durations)
+        return {
+            'view': view,
+            'encoding': encoding,
+            'level': level,
+            'bytes': len(content),
+            'compressed_bytes': len(compressed),
+            'saved_percent': round(
+                100 * (1 - len(compressed) / len(content)), 1),
+            'p50_ms': timing['p50_ms'],
+            'mb_per_second': round(
+                len(content) / timing['p50_ms'] / 1000, 1),
+        }
+
+    def print_results(self, results):
+        self.stdout.write(
+            f'{"view":<12}{"сжатие":>10}{"байт":>9}{"сжато":>9}'
+            f'{"экономия":>10}{"p50 мс":>9}{"МБ/с":>9}')
+        for result in results:
+            method = f'{result["encoding"]}:{result["level"]}'
+            self.stdout.write(
+                f'{result["view"]:<12}{method:>10}{result["bytes"]:>9}'
+                f'{result["compressed_bytes"]:>9}'
+                f'{result["saved_percent"]:>9.1f}%'
+                f'{result["p50_ms"]:>9.3f}{result["mb_per_second"]:>9.1f}')
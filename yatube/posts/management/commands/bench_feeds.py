@@ -0,0 +1,172 @@
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from faker import Faker
+
+from core.benchmark import (compare_reports, summarize, test_database,
+                            write_report)
+from posts.counters import recount_posts_counters
+from posts.models import Group, Post, User
+
+VIEWS = ('index', 'group_list', 'profile', 'post_detail', 'post_create')
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест лент: заполняет временную базу и замеряет '
+            'задержки p50/p95/p99, запросы к БД и запросы в секунду.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='запросов к каждому представлению')
+        parser.add_argument('--views', nargs='+', choices=VIEWS,
+                            default=VIEWS)
+        parser.add_argument('--pages', type=int, default=20,
+                            help='из скольких первых страниц выбирать')
+        parser.add_argument('--clear-cache', action='store_true',
+                            help='очищать кэш перед каждым запросом')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='куда сохранить отчёт JSON')
+        parser.add_argument('--compare', help='отчёт предыдущего запуска')
+        parser.add_argument('--threshold', type=float, default=1.2,
+                            help='допустимый рост p95 относительно '
+                                 'предыдущего запуска')
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['posts'], options['groups']) < 1:
+            raise CommandError('Нужны хотя бы один автор, группа и пост.')
+        self.random = random.Random(options['seed'])
+        with test_database():
+            started = time.perf_counter()
+            self.seed(options)
+            seeded = time.perf_counter() - started
+            self.stdout.write(f'База заполнена за {seeded:.1f} с.')
+            results = {
+                view: self.run(view, options) for view in options['views']
+            }
+        report = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'dataset': {name: options[name]
+                        for name in ('posts', 'users', 'groups')},
+            'requests_per_view': options['requests'],
+            'clear_cache': options['clear_cache'],
+            'seed_seconds': round(seeded, 1),
+            'results': results,
+        }
+        self.print_results(results)
+        if options['output']:
+            write_report(report, options['output'])
+        if options['compare']:
+            self.compare(report, options)
+
+    def seed(self, options):
+        faker = Faker('ru_RU')
+        faker.seed_instance(options['seed'])
+        User.objects.bulk_create(
+            (User(username=f'user{i}', password='!',
+                  first_name=faker.first_name(),
+                  last_name=faker.last_name())
+             for i in range(options['users'])),
+            batch_size=BATCH_SIZE)
+        Group.objects.bulk_create(
+            (Group(title=faker.sentence(nb_words=3), slug=f'group-{i}',
+                   description=faker.paragraph())
+             for i in range(options['groups'])),
+            batch_size=BATCH_SIZE)
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        group_ids = list(Group.objects.values_list('pk', flat=True)) + [None]
+        texts = [faker.paragraph(nb_sentences=5) for _ in range(1000)]
+        created = 0
+        while created < options['posts']:
+            size = min(BATCH_SIZE, options['posts'] - created)
+            Post.objects.bulk_create(
+                Post(author_id=self.random.choice(user_ids),
+                     group_id=self.random.choice(group_ids),
+                     text=self.random.choice(texts))
+                for _ in range(size))
+            created += size
+        recount_posts_counters()
+        cache.clear()
+
+    def addresses(self, view, options):
+        if view == 'index':
+            index = reverse('posts:index')
+            pages = options['pages']
+            return lambda: f'{index}?page={self.random.randint(1, pages)}'
+        if view == 'group_list':
+            slugs = list(Group.objects.values_list('slug', flat=True))
+            return lambda: reverse('posts:group_list',
+                                   args=[self.random.choice(slugs)])
+        if view == 'profile':
+            usernames = list(User.objects.values_list('username', flat=True))
+            return lambda: reverse('posts:profile',
+                                   args=[self.random.choice(usernames)])
+        if view == 'post_detail':
+            last = Post.objects.order_by('-pk').values_list(
+                'pk', flat=True).first()
+            return lambda: reverse('posts:post_detail',
+                                   args=[self.random.randint(1, last)])
+        return lambda: reverse('posts:post_create')
+
+    def run(self, view, options):
+        client = Client()
+        if view == 'post_create':
+            client.force_login(User.objects.first())
+        address = self.addresses(view, options)
+        durations = []
+        queries = []
+        started = time.perf_counter()
+        for number in range(options['requests']):
+            if options['clear_cache']:
+                cache.clear()
+            url = address()
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                if view == 'post_create':
+                    response = client.post(url, {'text': f'Пост {number}'})
+                else:
+                    response = client.get(url)
+                durations.append(time.perf_counter() - request_started)
+            queries.append(len(captured))
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{url} ответил {response.status_code}.')
+        return summarize(durations, queries,
+                         time.perf_counter() - started)
+
+    def print_results(self, results):
+        self.stdout.write(
+            f'{"view":<12}{"p50 мс":>10}{"p95 мс":>10}{"p99 мс":>10}'
+            f'{"запросов":>10}{"RPS":>10}')
+        for view, result in results.items():
+            self.stdout.write(
+                f'{view:<12}{result["p50_ms"]:>10.2f}'
+                f'{result["p95_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+                f'{result["queries_per_request"]:>10.1f}'
+                f'{result["requests_per_second"]:>10.1f}')
+
+    def compare(self, report, options):
+        with open(options['compare']) as stream:
+            previous = json.load(stream)
+        regressions = []
+        for view, before, after, regressed in compare_reports(
+                previous, report, threshold=options['threshold']):
+            line = f'{view}: p95 {before:.2f} → {after:.2f} мс'
+            if regressed:
+                regressions.append(view)
+                line = self.style.ERROR(line + ' (регрессия)')
+            self.stdout.write(line)
+        if regressions:
+            raise CommandError(
+                f'Регрессия задержки: {", ".join(regressions)}.')
@@ -0,0 +1,109 @@
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+from django.urls import reverse
+
+from core.benchmark import summarize, write_report
+from core.reverse import fast_reverse
+
+# Ссылки шапки сайта для вошедшего пользователя.
+HEADER = ('posts:index', 'about:author', 'about:tech', 'posts:search',
+          'posts:follow_index', 'posts:post_create', 'password_change',
+          'users:logout')
+# Ссылки одного поста в ленте (includes/article.html).
+ARTICLE = (('posts:profile', 'username'), ('posts:post_detail', 'pk'),
+           ('posts:group_list', 'slug'))
+
+TEMPLATES = {
+    'url': ("{% for name in header %}{% url name %}{% endfor %}"
+            "{% for post in posts %}"
+            "{% url 'posts:profile' post.username %}"
+            "{% url 'posts:post_detail' post.pk %}"
+            "{% url 'posts:group_list' post.slug %}"
+            "{% endfor %}"),
+    'fast_url': ("{% load fast_urls %}"
+                 "{% for name in header %}{% fast_url name %}{% endfor %}"
+                 "{% for post in posts %}"
+                 "{% fast_url 'posts:profile' post.username %}"
+                 "{% fast_url 'posts:post_detail' post.pk %}"
+                 "{% fast_url 'posts:group_list' post.slug %}"
+                 "{% endfor %}"),
+}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает, сколько стоят ссылки одной страницы ленты через '
+            'reverse() и {% url %} и через скомпилированные маршруты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=2000,
+                            help='сколько страниц построить каждым способом')
+        parser.add_argument('--posts', type=int,
+                            default=settings.POSTS_PER_PAGE,
+                            help='постов на странице')
+        parser.add_argument('--output', help='куда сохранить отчёт JSON')
+
+    def handle(self, *args, **options):
+        posts = [
+            SimpleNamespace(pk=1000 + i, username=f'user{i}',
+                            slug=f'group-{i}')
+            for i in range(options['posts'])
+        ]
+        methods = {
+            'reverse': lambda: self.build(reverse_args, posts),
+            'fast_reverse': lambda: self.build(fast_reverse, posts),
+        }
+        context = Context({'header': HEADER, 'posts': posts})
+        for name, source in TEMPLATES.items():
+            methods[f'{{% {name} %}}'] = (
+                lambda template=Template(source): template.render(context))
+        results = {name: self.measure(build, options['pages'])
+                   for name, build in methods.items()}
+        results['urls_per_page'] = len(HEADER) + len(ARTICLE) * len(posts)
+        self.print_results(results)
+        if options['output']:
+            write_report({'results': results}, options['output'])
+
+    @staticmethod
+    def build(reverse_func, posts):
+        urls = [reverse_func(name) for name in HEADER]
+        for post in posts:
+            urls += [reverse_func(name, getattr(post, field))
+                     for name, field in ARTICLE]
+        return urls
+
+    @staticmethod
+    def measure(build, pages):
+        build()
+        durations = []
+        for _ in range(pages):
+            started = time.perf_counter()
+            build()
+            durations.append(time.perf_counter() - started)
+        timing = summarize(durations)
+        return {'p50_ms': timing['p50_ms'], 'p95_ms': timing['p95_ms'],
+                'mean_ms': timing['mean_ms']}
+
+    def print_results(self, results):
+        self.stdout.write(
+            f'Ссылок на странице: {results["urls_per_page"]}')
+        self.stdout.write(
+            f'{"способ":<16}{"p50 мс":>10}{"p95 мс":>10}{"среднее":>10}')
+        for name in ('reverse', 'fast_reverse', '{% url %}',
+                     '{% fast_url %}'):
+            result = results[name]
+            self.stdout.write(
+                f'{name:<16}{result["p50_ms"]:>10.3f}'
+                f'{result["p95_ms"]:>10.3f}{result["mean_ms"]:>10.3f}')
+        for slow, fast in (('reverse', 'fast_reverse'),
+                           ('{% url %}', '{% fast_url %}')):
+            speedup = (results[slow]['mean_ms']
+                       / max(results[fast]['mean_ms'], 1e-9))
+            self.stdout.write(f'{fast} быстрее {slow} в {speedup:.1f} раза')
+
+
+def reverse_args(viewname, *args):
+    return reverse(viewname, args=args)
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Печатает EXPLAIN QUERY PLAN SQLite для запросов лент постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', help='slug группы для group_list')
+        parser.add_argument('--username', help='автор для profile')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        group_id = self.get_id(Group, 'slug', options['group'])
+        author_id = self.get_id(User, 'username', options['username'])
+        posts = Post.objects.select_related('author')
+        last = posts.order_by('-pub_date', '-pk').first()
+        feeds = {
+            'index': posts.all(),
+            'group_list': posts.filter(group_id=group_id),
+            'profile': posts.filter(author_id=author_id),
+        }
+        per_page = settings.POSTS_PER_PAGE
+        for name, queryset in feeds.items():
+            self.explain(f'{name}: страница', queryset[:per_page])
+            count_sql, params = (
+                queryset.values('pk').order_by().query.sql_with_params())
+            self.explain_sql(f'{name}: COUNT(*)',
+                             f'SELECT COUNT(*) FROM ({count_sql}) subquery',
+                             params)
+            if last is not None:
+                self.explain(
+                    f'{name}: курсор',
+                    queryset.filter(pub_date__lt=last.pub_date)
+                    .order_by('-pub_date', '-pk')[:per_page])
+
+    def get_id(self, model, field, value):
+        queryset = model.objects.all()
+        if value is not None:
+            queryset = queryset.filter(**{field: value})
+            if not queryset.exists():
+                raise CommandError(f'{model.__name__} {value!r} не найден.')
+        return queryset.values_list('pk', flat=True).first() or 1
+
+    def explain(self, title, queryset):
+        self.explain_sql(title, *queryset.query.sql_with_params())
+
+    def explain_sql(self, title, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = cursor.fetchall()
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        depth = {0: 0}
+        for node_id, parent, _, detail in plan:
+            depth[node_id] = depth.get(parent, 0) + 1
+            self.stdout.write('  ' * depth[node_id] + detail)
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import CHUNK_SIZE, EXPORT_FORMATS, export_posts
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты в JSONL или CSV, не загружая таблицу в память.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS,
+                            default='jsonl')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--author', help='username автора')
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--since', help='с даты (включительно)')
+        parser.add_argument('--until', help='по дату (не включительно)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--output', '-o',
+                            help='файл; по умолчанию stdout')
+
+    def handle(self, *args, **options):
+        try:
+            chunks = export_posts(
+                options['format'], options['gzip'], options['chunk_size'],
+                author=options['author'], group=options['group'],
+                since=options['since'], until=options['until'])
+            if options['output']:
+                with open(options['output'], 'wb') as stream:
+                    self.write(chunks, stream)
+            else:
+                self.write(chunks, sys.stdout.buffer)
+        except ValueError as error:
+            raise CommandError(error)
+
+    def write(self, chunks, stream):
+        for chunk in chunks:
+            stream.write(chunk)
@@ -0,0 +1,201 @@
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.cache import (author_feed, bump_feed_versions, group_feed,
+                         index_feed)
+from posts.counters import recount_posts_counters
+from posts.models import Group, Post, User
+from posts.timeline import fan_out_recent, get_followers_count, is_pulled
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты из JSONL или CSV с полями text, author, '
+            'group, pub_date пакетами через bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл с постами или - для stdin')
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            help='формат файла; по умолчанию — по расширению')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--checkpoint',
+                            help='файл для продолжения прерванного импорта')
+        parser.add_argument('--create-missing', action='store_true',
+                            help='создавать неизвестных авторов и группы')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        self.create_missing = options['create_missing']
+        self.authors = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.usernames = set()
+        self.slugs = set()
+        self.skipped = 0
+        checkpoint = options['checkpoint']
+        done = self.read_checkpoint(checkpoint)
+        imported = 0
+        started = time.monotonic()
+        with self.open(options['path']) as stream:
+            rows = islice(self.read_rows(stream, options), done, None)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    posts = [post for post in map(self.build_post, batch)
+                             if post is not None]
+                    self.create_posts(posts)
+                done += len(batch)
+                imported += len(posts)
+                self.write_checkpoint(checkpoint, done)
+                self.report(f'Обработано строк: {done}', imported, started)
+        recount_posts_counters()
+        self.fill_timelines()
+        bump_feed_versions(index_feed(),
+                           *map(author_feed, self.usernames),
+                           *map(group_feed, self.slugs))
+        self.report(
+            self.style.SUCCESS(f'Импортировано постов: {imported}, '
+                               f'пропущено строк: {self.skipped}'),
+            imported, started)
+
+    def create_posts(self, posts):
+        """Вставляет пачку постов с датами публикации из архива.
+
+        `auto_now_add` при вставке ставит текущее время, поэтому даты
+        записываются вторым запросом только для постов этой пачки.
+        Вызывается в транзакции пачки.
+        """
+        pub_dates = [post.pub_date for post in posts]
+        Post.objects.bulk_create(posts)
+        if posts and posts[0].pk is None:
+            # SQLite не возвращает id вставленных строк. Транзакция
+            # держит блокировку записи, поэтому посты пачки — последние
+            # по id и идут в порядке вставки.
+            pks = Post.objects.order_by('-pk').values_list(
+                'pk', flat=True)[:len(posts)]
+            for post, pk in zip(posts, reversed(list(pks))):
+                post.pk = pk
+        for post, pub_date in zip(posts, pub_dates):
+            post.pub_date = pub_date
+        Post.objects.bulk_update(posts, ['pub_date'])
+
+    def fill_timelines(self):
+        """Раскладывает посты по лентам подписчиков авторов.
+
+        bulk_create не вызывает `post_save`, поэтому посты не разложены.
+        Как и при подписке, в ленты попадают последние посты авторов;
+        посты популярных авторов читаются при показе ленты.
+        """
+        for username in self.usernames:
+            author_id = self.authors[username]
+            if not is_pulled(get_followers_count(author_id)):
+                fan_out_recent(author_id)
+
+    @contextmanager
+    def open(self, path):
+        if path == '-':
+            yield sys.stdin
+            return
+        if not os.path.exists(path):
+            raise CommandError(f'Файл {path} не найден.')
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8', newline='') as stream:
+            yield stream
+
+    def read_rows(self, stream, options):
+        row_format = options['format']
+        if row_format is None:
+            path = options['path']
+            row_format = ('csv' if path.endswith(('.csv', '.csv.gz'))
+                          else 'jsonl')
+        if row_format == 'csv':
+            yield from csv.DictReader(stream)
+            return
+        for line in stream:
+            if not line.strip():
+                continue
+            # Битая строка тоже занимает место в счёте строк контрольной
+            # точки, поэтому вместо неё отдаётся None.
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else None
+
+    def build_post(self, row):
+        if row is None:
+            self.skipped += 1
+            return None
+        try:
+            pub_date = parse_datetime(row.get('pub_date') or '')
+        except (TypeError, ValueError):
+            # Дата не строкой или в верном формате, но невозможная:
+            # 2020-02-30.
+            self.skipped += 1
+            return None
+        author_id = self.resolve(row.get('author'), self.authors,
+                                 self.create_author)
+        if author_id is None or not row.get('text'):
+            self.skipped += 1
+            return None
+        group_id = self.resolve(row.get('group'), self.groups,
+                                self.create_group)
+        if pub_date is None:
+            pub_date = timezone.now()
+        elif timezone.is_naive(pub_date):
+            pub_date = timezone.make_aware(pub_date)
+        self.usernames.add(row['author'])
+        if group_id is not None:
+            self.slugs.add(row['group'])
+        return Post(text=row['text'], author_id=author_id,
+                    group_id=group_id, pub_date=pub_date)
+
+    def resolve(self, key, known, create):
+        if not key:
+            return None
+        if key not in known and self.create_missing:
+            known[key] = create(key)
+        return known.get(key)
+
+    def create_author(self, username):
+        author = User(username=username)
+        author.set_unusable_password()
+        author.save()
+        return author.pk
+
+    def create_group(self, slug):
+        return Group.objects.create(title=slug, slug=slug,
+                                    description='').pk
+
+    def read_checkpoint(self, checkpoint):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as stream:
+            done = int(stream.read().strip() or 0)
+        self.stdout.write(f'Продолжаем импорт со строки {done + 1}.')
+        return done
+
+    def write_checkpoint(self, checkpoint, done):
+        if not checkpoint:
+            return
+        with open(f'{checkpoint}.tmp', 'w') as stream:
+            stream.write(str(done))
+        os.replace(f'{checkpoint}.tmp', checkpoint)
+
+    def report(self, message, imported, started):
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(f'{message} ({rate:.0f} постов/с, '
+                          f'{elapsed:.1f} с)')
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_posts_counters(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    posts = Post.objects.order_by()
+    for group_id, count in posts.filter(group__isnull=False).values_list(
+            'group').annotate(count=models.Count('pk')):
+        Group.objects.filter(pk=group_id).update(posts_count=count)
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=author_id, posts_count=count)
+        for author_id, count in posts.values_list('author').annotate(
+            count=models.Count('pk'))
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0004_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='post_stats', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+        ),
+        migrations.RunPython(fill_posts_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='authorstats',
+            index=models.Index(fields=['followers_count'], name='author_stats_followers_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:13
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_author_stats_followers_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='authorstats',
+            name='author_stats_followers_idx',
+        ),
+    ]
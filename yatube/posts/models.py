@@ -2,6 +2,8 @@ from django.db import models
 
 from django.contrib.auth import get_user_model
 
+from core.reverse import fast_reverse
+
 User = get_user_model()
 
 
@@ -9,16 +11,22 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField('Число постов', default=0,
+                                              editable=False)
 
     def __str__(self) -> str:
         return self.title
 
+    def get_absolute_url(self):
+        return fast_reverse('posts:group_list', self.slug)
+
 
 class Post(models.Model):
     text = models.TextField('Текст поста',
                             help_text='Введите текст поста')
     pub_date = models.DateTimeField('Дата публикации',
                                     auto_now_add=True)
+    modified = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
                                verbose_name='Автор')
@@ -28,10 +36,102 @@ class Post(models.Model):
                               on_delete=models.SET_NULL,
                               verbose_name='Группа',
                               help_text='Выберите группу')
+    image = models.ImageField('Картинка',
+                              upload_to='posts/',
+                              blank=True)
 
     def __str__(self) -> str:
         return self.text[0:15]
 
+    def get_absolute_url(self):
+        return fast_reverse('posts:post_detail', self.pk)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Запоминаем автора и группу, чтобы при сохранении поправить
+        # счётчики постов у прежних владельцев, и картинку, чтобы
+        # создавать миниатюры только для новой.
+        post._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in ('author_id', 'group_id', 'image')
+        }
+        return post
+
     class Meta:
         ordering = ['-pub_date']
         default_related_name = 'posts'
+        indexes = [
+            models.Index(fields=['pub_date', 'id'],
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованная статистика автора."""
+    author = models.OneToOneField(User,
+                                  on_delete=models.CASCADE,
+                                  related_name='post_stats',
+                                  verbose_name='Автор')
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField('Число подписчиков',
+                                                  default=0)
+
+    def __str__(self) -> str:
+        return f'{self.author}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='follower',
+                             verbose_name='Подписчик')
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='following',
+                               verbose_name='Автор')
+
+    def __str__(self) -> str:
+        return f'{self.user} -> {self.author}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+            models.CheckConstraint(check=~models.Q(user=models.F('author')),
+                                   name='no_self_follow'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в предвычисленной ленте подписок читателя.
+
+    Дата публикации скопирована из поста, чтобы страница ленты читалась
+    по индексу `(owner, pub_date, post)` без соединения с постами.
+    """
+    owner = models.ForeignKey(User,
+                              on_delete=models.CASCADE,
+                              related_name='timeline',
+                              verbose_name='Читатель')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='timeline_entries',
+                             verbose_name='Пост')
+    pub_date = models.DateTimeField('Дата публикации')
+
+    def __str__(self) -> str:
+        return f'{self.owner}: {self.post_id}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'pub_date', 'post'],
+                         name='timeline_owner_pub_date_idx'),
+        ]
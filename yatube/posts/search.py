@@ -0,0 +1,144 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+# Маркеры подсветки, которых не бывает в тексте поста: фрагмент
+# экранируется целиком, и только потом маркеры заменяются на <mark>.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+SEARCH_INDEX_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+        AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+        AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+        AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+]
+
+
+def search_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def ensure_search_index(using=connection, create=True):
+    """Создаёт индекс FTS5 и триггеры, если их нет.
+
+    SQLite пересоздаёт таблицу постов при изменении её схемы и теряет
+    триггеры, поэтому после каждой миграции они восстанавливаются
+    с `create=False`: только если сам индекс уже создан миграцией.
+    """
+    if not search_available(using):
+        return
+    with using.cursor() as cursor:
+        created = FTS_TABLE not in using.introspection.table_names(cursor)
+        if created and not create:
+            return
+        for sql in SEARCH_INDEX_SQL:
+            cursor.execute(sql)
+        if created:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def build_match_query(query):
+    """Превращает пользовательский ввод в запрос FTS5.
+
+    Каждое слово берётся в кавычки, чтобы спецсимволы FTS5 не ломали
+    запрос, и ищется как префикс, чтобы находить словоформы.
+    """
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>'))
+
+
+def filter_matching(queryset, query):
+    """Оставляет в выборке постов только подходящие под запрос."""
+    match = build_match_query(query)
+    if not match:
+        return queryset.none()
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        where=[f'{table}.id IN (SELECT rowid FROM {FTS_TABLE} '
+               f'WHERE {FTS_TABLE} MATCH %s)'],
+        params=[match],
+    )
+
+
+class PostSearch:
+    """Результаты поиска, упорядоченные по релевантности (bm25).
+
+    Поддерживает `count()` и срезы, поэтому подходит для `Paginator`:
+    каждая страница — один запрос к индексу и один к таблице постов.
+    """
+
+    def __init__(self, query):
+        self.match = build_match_query(query)
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s', [self.match])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('PostSearch supports only slicing.')
+        if not self.match:
+            return []
+        offset = index.start or 0
+        limit = index.stop - offset if index.stop is not None else -1
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, snippet({FTS_TABLE}, 0, %s, %s, '…', 24) "
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [HIGHLIGHT_START, HIGHLIGHT_END, self.match, limit, offset])
+            snippets = cursor.fetchall()
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [post_id for post_id, _ in snippets])
+        results = []
+        for post_id, snippet in snippets:
+            if post_id in posts:
+                post = posts[post_id]
+                post.snippet = highlight(snippet)
+                results.append(post)
+        return results
+
+
+def search_posts(query):
+    if search_available():
+        return PostSearch(query)
+    # Без FTS5 остаётся обычный поиск по подстроке.
+    return Post.objects.select_related('author', 'group').filter(
+        text__icontains=query)
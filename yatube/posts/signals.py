@@ -0,0 +1,132 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .cache import (GROUPS, author_feed, author_group_feeds,
+                    bump_feed_versions, group_author_feeds, group_feed,
+                    index_feed, invalidate_post_feeds)
+from .models import Follow, Group, Post, User
+from .tasks import (fan_out, make_thumbnails, update_follow,
+                    update_posts_counters)
+
+
+def changed_ids(old_id, new_id):
+    """Владельцы, чьи счётчики меняются, когда пост переходит к `new_id`."""
+    if old_id == new_id:
+        return set()
+    return {pk for pk in (old_id, new_id) if pk is not None}
+
+
+def image_changed(post, loaded):
+    """Загружена ли новая картинка, которой нужны миниатюры."""
+    if 'image' in post.get_deferred_fields() or not post.image:
+        return False
+    return post.image.name != loaded.get('image', post.image.name)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        loaded = dict.fromkeys(('author_id', 'group_id', 'image'))
+    else:
+        # Для постов, загруженных не целиком, счётчики поправит
+        # recount_posts_counters.
+        loaded = getattr(instance, '_loaded_values', {})
+    old_author_id = loaded.get('author_id', instance.author_id)
+    author_ids = changed_ids(old_author_id, instance.author_id)
+    old_group_id = loaded.get('group_id', instance.group_id)
+    group_ids = changed_ids(old_group_id, instance.group_id)
+    # Кэш сбрасываем сразу, чтобы автор увидел свой пост; счётчики и
+    # ленты подписчиков обновятся в фоне.
+    invalidate_post_feeds({old_author_id, instance.author_id},
+                          {old_group_id, instance.group_id})
+    if author_ids or group_ids:
+        update_posts_counters.delay(author_ids, group_ids)
+    if created:
+        fan_out.delay(instance.pk)
+    if image_changed(instance, loaded):
+        make_thumbnails.delay(instance.pk)
+    instance._loaded_values = {
+        'author_id': instance.author_id,
+        'group_id': instance.group_id,
+    }
+    if 'image' not in instance.get_deferred_fields():
+        instance._loaded_values['image'] = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    invalidate_post_feeds({instance.author_id}, {instance.group_id})
+    update_posts_counters.delay(changed_ids(instance.author_id, None),
+                                changed_ids(instance.group_id, None))
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changing(sender, instance, raw=False, **kwargs):
+    """Запоминает ленты, где группа показана до изменения.
+
+    Среди них лента со старым слагом и ленты авторов постов группы: при
+    удалении группы посты отвязываются от неё раньше `post_delete`.
+    """
+    if raw or instance.pk is None:
+        return
+    old_slug = Group.objects.filter(pk=instance.pk).values_list(
+        'slug', flat=True).first()
+    instance._shown_in_feeds = group_author_feeds(instance.pk)
+    if old_slug is not None:
+        instance._shown_in_feeds.append(group_feed(old_slug))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_feed_versions(index_feed(), group_feed(instance.slug), GROUPS,
+                       *getattr(instance, '_shown_in_feeds', []))
+    instance._shown_in_feeds = []
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, raw, update_fields, **kwargs):
+    """Запоминает ленту автора под прежним именем."""
+    if (raw or instance.pk is None
+            or update_fields == frozenset(['last_login'])):
+        return
+    old_username = User.objects.filter(pk=instance.pk).values_list(
+        'username', flat=True).first()
+    if old_username is not None:
+        instance._old_author_feed = author_feed(old_username)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw, update_fields, **kwargs):
+    if raw or update_fields == frozenset(['last_login']):
+        return
+    if created:
+        bump_feed_versions(author_feed(instance.username))
+        return
+    # Имя автора показано в его постах на главной и в лентах групп.
+    feeds = [index_feed(), author_feed(instance.username),
+             *author_group_feeds(instance.pk)]
+    if hasattr(instance, '_old_author_feed'):
+        feeds.append(instance._old_author_feed)
+        del instance._old_author_feed
+    bump_feed_versions(*feeds)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw, **kwargs):
+    if raw or not created:
+        return
+    update_follow.delay(instance.user_id, instance.author_id)
+    bump_feed_versions(author_feed(instance.author.username))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    update_follow.delay(instance.user_id, instance.author_id)
+    bump_feed_versions(author_feed(instance.author.username))
@@ -0,0 +1,68 @@
+from django.db import transaction
+
+from core.tasks import task
+from core.thumbnails import generate_thumbnails
+
+from . import timeline
+from .cache import invalidate_post_feeds
+from .counters import (count_all_posts, recount_author_counters,
+                       recount_group_posts_count)
+from .models import Follow, Post
+
+
+@task
+def update_posts_counters(author_ids, group_ids):
+    """Пересчитывает счётчики постов и сбрасывает кэш лент, где они показаны.
+
+    Счётчики считаются заново, поэтому повтор задачи после ошибки
+    при сбросе кэша не применяет изменение второй раз.
+    """
+    with transaction.atomic():
+        for author_id in author_ids:
+            recount_author_counters(author_id)
+        for group_id in group_ids:
+            recount_group_posts_count(group_id)
+    invalidate_post_feeds(author_ids, group_ids)
+
+
+@task
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'author_id', 'pub_date').first()
+    if post is not None:
+        timeline.fan_out_post(post)
+
+
+@task
+def update_follow(user_id, author_id):
+    """Счётчик подписчиков и лента читателя после (от)писки.
+
+    Задачи подписки и отписки могут выполниться в любом порядке,
+    поэтому лента приводится к тому, что записано в `Follow` сейчас.
+    """
+    with transaction.atomic():
+        was_pulled = timeline.is_pulled(
+            timeline.get_followers_count(author_id))
+        recount_author_counters(author_id)
+        if Follow.objects.filter(user_id=user_id,
+                                 author_id=author_id).exists():
+            timeline.follow_started(user_id, author_id)
+        else:
+            timeline.follow_stopped(user_id, author_id)
+        # Сравниваем записанные счётчики, а не число с порогом: несколько
+        # отписок подряд могут перешагнуть порог за один пересчёт.
+        if was_pulled and not timeline.is_pulled(
+                timeline.get_followers_count(author_id)):
+            timeline.fan_out_recent(author_id)
+
+
+@task
+def make_thumbnails(post_id):
+    post = Post.objects.filter(pk=post_id).only('pk', 'image').first()
+    if post is not None and post.image:
+        generate_thumbnails(post.image)
+
+
+@task
+def refresh_total_posts_count():
+    count_all_posts()
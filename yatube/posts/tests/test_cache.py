@@ -0,0 +1,273 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connections
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from core import routers
+from core.routers import ReplicaRouter, use_replica
+from posts.cache import (author_feed, bump_feed_versions, cache_feed,
+                         group_feed, index_feed, version_key)
+from posts.models import Group, Post, get_user_model
+
+
+User = get_user_model()
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.other_author = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Описание',
+        )
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Тестовый пост')
+        cls.index = reverse('posts:index')
+        cls.group_list = reverse('posts:group_list', args=[cls.group.slug])
+        cls.other_group_list = reverse('posts:group_list',
+                                       args=[cls.other_group.slug])
+        cls.profile = reverse('posts:profile', args=[cls.author.username])
+        cls.other_profile = reverse('posts:profile',
+                                    args=[cls.other_author.username])
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_guest_pages_are_cached(self):
+        for address in (self.index, self.group_list, self.profile):
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                with self.assertNumQueries(0):
+                    cached = self.guest_client.get(address)
+                self.assertEqual(cached.content, response.content)
+
+    def test_authorized_pages_are_not_cached(self):
+        self.author_client.get(self.index)
+        with self.assertNumQueries(4):
+            self.author_client.get(self.index)
+
+    def test_new_post_invalidates_only_its_feeds(self):
+        addresses = (self.index, self.group_list, self.other_group_list,
+                     self.profile, self.other_profile)
+        for address in addresses:
+            self.guest_client.get(address)
+        self.author_client.post(reverse('posts:post_create'), data={
+            'text': 'Новый пост', 'group': self.group.id})
+        for address in (self.index, self.group_list, self.profile):
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertContains(response, 'Новый пост')
+        for address in (self.other_group_list, self.other_profile):
+            with self.subTest(address=address):
+                with self.assertNumQueries(0):
+                    self.guest_client.get(address)
+
+    def test_edit_invalidates_old_and_new_group(self):
+        self.guest_client.get(self.group_list)
+        self.guest_client.get(self.other_group_list)
+        self.author_client.post(
+            reverse('posts:post_edit', args=[self.post.id]),
+            data={'text': 'Перенесённый пост', 'group': self.other_group.id})
+        response = self.guest_client.get(self.group_list)
+        self.assertNotContains(response, 'Перенесённый пост')
+        response = self.guest_client.get(self.other_group_list)
+        self.assertContains(response, 'Перенесённый пост')
+
+    def test_author_rename_invalidates_all_feeds_with_author(self):
+        for address in (self.index, self.group_list, self.profile):
+            self.guest_client.get(address)
+        self.author.username = 'renamed'
+        self.author.first_name = 'Лев'
+        self.author.save()
+        for address in (self.index, self.group_list):
+            with self.subTest(address=address):
+                self.assertContains(self.guest_client.get(address), 'Лев')
+        self.assertEqual(self.guest_client.get(self.profile).status_code,
+                         HTTPStatus.NOT_FOUND)
+
+    def test_group_change_invalidates_old_slug_and_author_feeds(self):
+        for address in (self.group_list, self.profile):
+            self.guest_client.get(address)
+        self.group.slug = 'new-slug'
+        self.group.save()
+        self.assertEqual(self.guest_client.get(self.group_list).status_code,
+                         HTTPStatus.NOT_FOUND)
+        self.assertContains(self.guest_client.get(self.profile),
+                            '/group/new-slug/')
+
+    def test_non_ascii_feed_keys_are_safe_for_memcached(self):
+        for feed in (author_feed('автор'), group_feed('группа')):
+            with self.subTest(feed=feed):
+                key = version_key(feed)
+                self.assertTrue(key.isascii())
+                self.assertNotIn(' ', key)
+
+
+@mock.patch.dict(connections.databases, {'replica': {}})
+class FeedCacheReplicaLagTest(TestCase):
+    """Страницу, которую кэшируют сразу после изменения ленты, читают
+    с основной базы: реплика могла ещё не получить изменение."""
+
+    def setUp(self):
+        cache.clear()
+        self.databases_used = []
+
+        @use_replica
+        @cache_feed(index_feed)
+        def view(request):
+            self.databases_used.append(ReplicaRouter().db_for_read(Post))
+            return HttpResponse('Лента')
+
+        self.view = view
+
+    def get(self, path):
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        routers.start_request(False)
+        try:
+            return self.view(request)
+        finally:
+            routers.finish_request()
+
+    def test_recently_changed_feed_is_rendered_from_primary(self):
+        bump_feed_versions(index_feed())
+        self.get('/')
+        cache.set(version_key(index_feed()),
+                  int((time.time() - settings.REPLICA_PIN_SECONDS) * 1000),
+                  None)
+        self.get('/')
+        self.assertEqual(self.databases_used, [None, 'replica'])
+
+
+class PostFragmentCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author,
+                                       text='Тестовый пост')
+        cls.profile = reverse('posts:profile', args=[cls.author.username])
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_article_fragment_is_cached_per_post_version(self):
+        self.author_client.get(self.profile)
+        key = make_template_fragment_key(
+            'post_article',
+            [self.post.pk, self.post.modified, 'auth', '', ''])
+        self.assertIn('Тестовый пост', cache.get(key))
+        self.author_client.post(
+            reverse('posts:post_edit', args=[self.post.id]),
+            data={'text': 'Исправленный пост'})
+        response = self.author_client.get(self.profile)
+        self.assertContains(response, 'Исправленный пост')
+        self.assertNotContains(response, 'Тестовый пост')
+
+    def test_fragment_follows_author_and_group_changes(self):
+        group = Group.objects.create(title='Группа', slug='old-slug',
+                                     description='Описание')
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        self.author_client.get(self.profile)
+        self.author.first_name = 'Лев'
+        self.author.save()
+        group.slug = 'new-slug'
+        group.save()
+        response = self.author_client.get(self.profile)
+        self.assertContains(response, 'Лев')
+        self.assertContains(response, '/group/new-slug/')
+        self.assertNotContains(response, '/group/old-slug/')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author,
+                                       text='Тестовый пост')
+        cls.post_detail = reverse('posts:post_detail', args=[cls.post.id])
+        cls.profile = reverse('posts:profile', args=[cls.author.username])
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_unchanged_pages_answer_not_modified(self):
+        for address in (reverse('posts:index'), self.profile,
+                        self.post_detail):
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertTrue(response.has_header('Last-Modified'))
+                response = self.guest_client.get(
+                    address, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(response.content, b'')
+
+    def test_edited_post_is_sent_again(self):
+        etags = {
+            address: self.guest_client.get(address)['ETag']
+            for address in (self.profile, self.post_detail)
+        }
+        self.author_client.post(
+            reverse('posts:post_edit', args=[self.post.id]),
+            data={'text': 'Исправленный пост'})
+        for address, etag in etags.items():
+            with self.subTest(address=address):
+                response = self.guest_client.get(
+                    address, HTTP_IF_NONE_MATCH=etag)
+                self.assertContains(response, 'Исправленный пост')
+
+    def test_etag_depends_on_user(self):
+        guest = self.guest_client.get(self.post_detail)
+        response = self.author_client.get(
+            self.post_detail, HTTP_IF_NONE_MATCH=guest['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_renamed_group_is_sent_again(self):
+        group = Group.objects.create(title='Старое название', slug='old',
+                                     description='Описание')
+        post = Post.objects.create(author=self.author, group=group,
+                                   text='Пост в группе')
+        address = reverse('posts:post_detail', args=[post.id])
+        etag = self.guest_client.get(address)['ETag']
+        group.title = 'Новое название'
+        group.save()
+        response = self.guest_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новое название')
+
+    def test_etag_follows_group_feed(self):
+        group = Group.objects.create(title='Группа', slug='stamped',
+                                     description='Описание')
+        post = Post.objects.create(author=self.author, group=group,
+                                   text='Пост в группе')
+        address = reverse('posts:post_detail', args=[post.id])
+        etag = self.guest_client.get(address)['ETag']
+        bump_feed_versions(group_feed(group.slug))
+        response = self.guest_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
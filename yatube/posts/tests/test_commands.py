@@ -0,0 +1,192 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.management.commands.import_posts import (
+    Command as ImportPostsCommand)
+from posts.models import Follow, Group, Post, get_user_model
+
+
+User = get_user_model()
+
+
+class ExplainFeedsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание',
+        )
+        Post.objects.create(author=cls.author, group=cls.group,
+                            text='Тестовый пост')
+
+    def test_feeds_use_composite_indexes(self):
+        out = StringIO()
+        call_command('explain_feeds', group='test-slug', username='auth',
+                     stdout=out)
+        plan = out.getvalue()
+        for index in ('post_pub_date_id_idx', 'post_group_pub_date_idx',
+                      'post_author_pub_date_idx'):
+            with self.subTest(index=index):
+                self.assertIn(index, plan)
+
+
+class ImportPostsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание',
+        )
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'posts.jsonl')
+        self.checkpoint = os.path.join(self.tmp_dir.name, 'checkpoint')
+        rows = [
+            {'text': f'Архивный пост {i}', 'author': 'auth',
+             'group': 'test-slug', 'pub_date': f'2020-01-0{i}T10:00:00'}
+            for i in range(1, 6)
+        ]
+        rows.append({'text': 'Пост неизвестного', 'author': 'nobody'})
+        with open(self.path, 'w') as stream:
+            for row in rows:
+                stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_import_posts_in_batches(self):
+        out = StringIO()
+        call_command('import_posts', self.path, batch_size=2, stdout=out)
+        self.assertEqual(Post.objects.count(), 5)
+        post = Post.objects.get(text='Архивный пост 1')
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.group, self.group)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 5)
+        self.assertIn('Импортировано постов: 5, пропущено строк: 1',
+                      out.getvalue())
+
+    def test_other_posts_get_current_date_during_import(self):
+        command = ImportPostsCommand()
+        build_post = command.build_post
+        created = []
+
+        def build_post_and_save_other(row):
+            created.append(Post.objects.create(author=self.author,
+                                               text='Новый пост'))
+            return build_post(row)
+
+        with mock.patch.object(command, 'build_post',
+                               build_post_and_save_other):
+            call_command(command, self.path, batch_size=2,
+                         stdout=StringIO())
+        self.assertEqual(
+            Post.objects.filter(pub_date__year=2020).count(), 5)
+        for post in created:
+            post.refresh_from_db()
+            self.assertGreater(post.pub_date.year, 2020)
+
+    def test_imported_posts_reach_followers_timelines(self):
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        call_command('import_posts', self.path, stdout=StringIO())
+        self.assertEqual(reader.timeline.count(), 5)
+
+    def test_bad_rows_are_skipped(self):
+        with open(self.path, 'a') as stream:
+            stream.write('{"text": "Оборванная строка\n')
+            stream.write('["не", "объект"]\n')
+            stream.write(json.dumps({'text': 'Невозможная дата',
+                                     'author': 'auth',
+                                     'pub_date': '2020-02-30T10:00:00'}))
+            stream.write('\n')
+        out = StringIO()
+        call_command('import_posts', self.path, stdout=out)
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertIn('Импортировано постов: 5, пропущено строк: 4',
+                      out.getvalue())
+
+    def test_format_is_taken_from_last_extension(self):
+        path = os.path.join(self.tmp_dir.name, 'posts.csv.bak.jsonl')
+        os.replace(self.path, path)
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_import_resumes_from_checkpoint(self):
+        with open(self.checkpoint, 'w') as stream:
+            stream.write('3')
+        call_command('import_posts', self.path, checkpoint=self.checkpoint,
+                     create_missing=True, stdout=StringIO())
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Архивный пост 4', 'Архивный пост 5', 'Пост неизвестного'])
+        self.assertTrue(User.objects.filter(username='nobody').exists())
+        with open(self.checkpoint) as stream:
+            self.assertEqual(stream.read(), '6')
+
+
+class ExportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание',
+        )
+        Post.objects.create(author=cls.author, group=cls.group,
+                            text='Пост автора')
+        Post.objects.create(author=cls.other, text='Пост, с "запятой"')
+
+    def test_command_exports_jsonl_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'posts.jsonl.gz')
+            call_command('export_posts', gzip=True, author='auth',
+                         output=path)
+            with gzip.open(path, 'rt', encoding='utf-8') as stream:
+                rows = [json.loads(line) for line in stream]
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(rows[0]['text'], 'Пост автора')
+            self.assertEqual(rows[0]['group'], 'test-slug')
+            Post.objects.all().delete()
+            call_command('import_posts', path, stdout=StringIO())
+        self.assertTrue(Post.objects.filter(
+            text='Пост автора', group=self.group).exists())
+
+    def test_export_view_is_staff_only_and_streams_csv(self):
+        client = Client()
+        address = reverse('posts:export')
+        response = client.get(address)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        client.force_login(self.staff)
+        response = client.get(address, {'format': 'csv',
+                                        'since': '2000-01-01'})
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(
+            io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(
+            sorted(row['text'] for row in rows),
+            ['Пост автора', 'Пост, с "запятой"'])
+        response = client.get(address, {'until': 'вчера'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
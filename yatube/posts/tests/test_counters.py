@@ -0,0 +1,154 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.counters import (TOTAL_POSTS_KEY, get_total_posts_count,
+                            recount_posts_counters)
+from posts.models import AuthorStats, Follow, Group, Post, get_user_model
+from posts.tasks import update_follow, update_posts_counters
+
+
+User = get_user_model()
+
+
+class PostsCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Описание',
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def assertCounters(self, author_count, group_count, other_group_count):
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(stats.posts_count, author_count)
+        self.assertEqual(self.group.posts_count, group_count)
+        self.assertEqual(self.other_group.posts_count, other_group_count)
+
+    def test_counters_follow_create_edit_and_delete(self):
+        self.author_client.post(reverse('posts:post_create'), data={
+            'text': 'Тестовый пост', 'group': self.group.id})
+        self.author_client.post(reverse('posts:post_create'), data={
+            'text': 'Тестовый пост без группы'})
+        self.assertCounters(2, 1, 0)
+        post = Post.objects.get(group=self.group)
+        self.author_client.post(
+            reverse('posts:post_edit', args=[post.id]),
+            data={'text': 'Новый текст', 'group': self.other_group.id})
+        self.assertCounters(2, 0, 1)
+        Post.objects.get(pk=post.pk).delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_pages_show_counters(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text='Тестовый пост')
+            for _ in range(3))
+        recount_posts_counters()
+        self.assertCounters(3, 3, 0)
+        post = Post.objects.first()
+        for address in (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[post.id]),
+        ):
+            with self.subTest(address=address):
+                response = self.author_client.get(address)
+                self.assertEqual(response.context['posts_count'], 3)
+
+    def test_repeated_and_late_tasks_do_not_drift(self):
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Тестовый пост')
+        for _ in range(2):
+            update_posts_counters({self.author.pk}, {self.group.pk})
+        self.assertCounters(1, 1, 0)
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        Follow.objects.filter(user=reader).delete()
+        # Задача подписки выполнилась после задачи отписки.
+        update_follow(reader.pk, self.author.pk)
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertFalse(reader.timeline.exists())
+
+    def test_author_sees_exact_count_right_after_writing(self):
+        Post.objects.create(author=self.author, text='Тестовый пост')
+        # Фоновый пересчёт ещё не дошёл до счётчика.
+        AuthorStats.objects.filter(author=self.author).update(posts_count=0)
+        address = reverse('posts:profile', args=[self.author.username])
+        response = self.author_client.get(address)
+        self.assertEqual(response.context['posts_count'], 0)
+        self.author_client.cookies[settings.REPLICA_PIN_COOKIE] = '1'
+        response = self.author_client.get(address)
+        self.assertEqual(response.context['posts_count'], 1)
+
+
+@override_settings(POSTS_EXACT_COUNT_BELOW=0, POSTS_COUNT_MAX_AGE=60)
+class TotalPostsCountTest(TestCase):
+    """Число постов на главной берётся из кэша и обновляется в фоне."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text='Тестовый пост') for _ in range(3))
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def add_posts(self, count):
+        Post.objects.bulk_create(
+            Post(author=self.author, text='Новый пост') for _ in range(count))
+
+    def test_fresh_count_is_taken_from_cache(self):
+        self.assertEqual(get_total_posts_count(), 3)
+        self.add_posts(2)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_total_posts_count(), 3)
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, 3)
+
+    def test_stale_count_is_refreshed_in_background(self):
+        cache.set(TOTAL_POSTS_KEY, (3, time.time() - 61), None)
+        self.add_posts(2)
+        self.assertEqual(get_total_posts_count(), 3)
+        self.assertEqual(cache.get(TOTAL_POSTS_KEY)[0], 5)
+        self.assertEqual(get_total_posts_count(), 5)
+
+    @override_settings(POSTS_EXACT_COUNT_BELOW=10)
+    def test_small_table_is_counted_exactly(self):
+        get_total_posts_count()
+        self.add_posts(2)
+        self.assertIsNone(get_total_posts_count())
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, 5)
+
+    @override_settings(POSTS_EXACT_COUNT_BELOW=5)
+    def test_table_grown_past_threshold_uses_cached_count(self):
+        get_total_posts_count()
+        self.add_posts(4)
+        cache.set(TOTAL_POSTS_KEY, (3, time.time() - 61), None)
+        self.assertIsNone(get_total_posts_count())
+        self.assertEqual(cache.get(TOTAL_POSTS_KEY)[0], 7)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_total_posts_count(), 7)
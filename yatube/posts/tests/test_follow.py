@@ -0,0 +1,140 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import (AuthorStats, Follow, Post, TimelineEntry,
+                          get_user_model)
+from posts.tasks import update_follow
+from posts.timeline import TimelinePaginator
+
+
+User = get_user_model()
+
+
+class FollowTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.stranger = User.objects.create_user(username='stranger')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def follow(self, client=None):
+        client = client or self.reader_client
+        return client.get(reverse('posts:profile_follow',
+                                  args=[self.author.username]))
+
+    def feed(self, client=None, **params):
+        client = client or self.reader_client
+        response = client.get(reverse('posts:follow_index'), params)
+        return response.context['page_obj']
+
+    def test_follow_and_unfollow(self):
+        response = self.follow()
+        self.assertRedirects(response, reverse('posts:profile',
+                                               args=[self.author.username]))
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.reader_client.get(reverse('posts:profile_unfollow',
+                                       args=[self.author.username]))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_author_can_not_follow_self(self):
+        self.follow(self.author_client)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_new_post_is_fanned_out_to_followers_only(self):
+        self.follow()
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'Новый пост'})
+        post = Post.objects.get()
+        self.assertTrue(TimelineEntry.objects.filter(
+            owner=self.reader, post=post).exists())
+        self.assertEqual(list(self.feed()), [post])
+        stranger_client = Client()
+        stranger_client.force_login(self.stranger)
+        self.assertEqual(len(self.feed(stranger_client)), 0)
+
+    def test_follow_backfills_and_unfollow_clears_timeline(self):
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.follow()
+        self.assertEqual(len(self.feed()), 1)
+        self.reader_client.get(reverse('posts:profile_unfollow',
+                                       args=[self.author.username]))
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(FANOUT_FOLLOWER_LIMIT=0, POSTS_PER_PAGE=2)
+    def test_popular_author_posts_are_pulled_and_merged(self):
+        Follow.objects.create(user=self.reader, author=self.stranger)
+        Post.objects.create(author=self.stranger, text='Пост 1')
+        self.follow()
+        Post.objects.create(author=self.author, text='Пост 2')
+        Post.objects.create(author=self.stranger, text='Пост 3')
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__author=self.author).exists())
+        first_page = self.feed()
+        second_page = self.feed(cursor=first_page.next_cursor)
+        texts = [post.text for post in list(first_page) + list(second_page)]
+        self.assertEqual(texts, ['Пост 3', 'Пост 2', 'Пост 1'])
+
+    def test_feed_queries_do_not_depend_on_follows(self):
+        for number in range(5):
+            author = User.objects.create_user(username=f'author_{number}')
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(author=author, text='Пост')
+        # Сессия, пользователь и два запроса страницы ленты.
+        with self.assertNumQueries(4):
+            self.feed()
+
+    @override_settings(FANOUT_FOLLOWER_LIMIT=2)
+    def test_author_back_under_limit_is_fanned_out_again(self):
+        self.follow()
+        followers = [User.objects.create_user(username=f'follower_{i}')
+                     for i in range(3)]
+        for follower in followers:
+            Follow.objects.create(user=follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(TimelineEntry.objects.exists())
+        # Все отписки записаны раньше, чем выполнилась первая задача.
+        with mock.patch('posts.signals.update_follow'):
+            Follow.objects.filter(user__in=followers).delete()
+        for follower in followers:
+            update_follow(follower.pk, self.author.pk)
+        self.assertTrue(TimelineEntry.objects.filter(
+            owner=self.reader, post=post).exists())
+
+    @override_settings(FANOUT_FOLLOWER_LIMIT=0)
+    def test_pulled_posts_are_read_per_author_with_limit(self):
+        Follow.objects.create(user=self.reader, author=self.stranger)
+        self.follow()
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}') for i in range(5))
+        with CaptureQueriesContext(connection) as queries:
+            page = TimelinePaginator(self.reader, 2).get_page()
+        self.assertEqual(len(page), 2)
+        # Лента, популярные подписки и по запросу на каждого автора.
+        self.assertEqual(len(queries), 4)
+        for query in queries.captured_queries[-2:]:
+            self.assertIn('LIMIT 3', query['sql'])
+
+    @override_settings(FANOUT_FOLLOWER_LIMIT=0)
+    def test_followed_author_is_pulled_among_many_popular_authors(self):
+        # Больше популярных авторов, чем раньше дочитывалось с сайта.
+        User.objects.bulk_create(
+            User(username=f'popular_{number}') for number in range(101))
+        AuthorStats.objects.bulk_create(
+            AuthorStats(author=author, followers_count=5)
+            for author in User.objects.filter(username__startswith='popular_'))
+        self.follow()
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(list(self.feed()), [post])
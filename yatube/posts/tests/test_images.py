@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, get_user_model
+
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(os.path.join(TEMP_MEDIA_ROOT, 'cache'),
+                      ignore_errors=True)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_upload_generates_all_thumbnails(self):
+        image = SimpleUploadedFile('small.gif', SMALL_GIF,
+                                   content_type='image/gif')
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'Пост с картинкой', 'image': image})
+        post = Post.objects.get()
+        self.assertEqual(post.image.name, 'posts/small.gif')
+        thumbnails = [
+            name for _, _, names in os.walk(
+                os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+            for name in names
+        ]
+        self.assertEqual(len(thumbnails), len(settings.THUMBNAIL_SIZES))
+
+    def test_pages_show_thumbnail(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой',
+            image=SimpleUploadedFile('page.gif', SMALL_GIF,
+                                     content_type='image/gif'))
+        for address in (reverse('posts:profile', args=[self.author.username]),
+                        reverse('posts:post_detail', args=[post.id])):
+            with self.subTest(address=address):
+                response = self.author_client.get(address)
+                self.assertContains(response, settings.MEDIA_URL + 'cache/')
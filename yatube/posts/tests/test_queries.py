@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.cache import GROUPS, get_feed_versions, get_groups
+from posts.counters import recount_posts_counters
+from posts.models import Group, Post, get_user_model
+
+
+User = get_user_model()
+
+POSTS_COUNT = 15
+
+
+class PostsQueriesTest(TestCase):
+    """Число запросов к БД на странице не зависит от числа постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание',
+        )
+        authors = [
+            User.objects.create_user(username=f'user_{i}')
+            for i in range(POSTS_COUNT)
+        ]
+        groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'slug-{i}',
+                                 description='Описание')
+            for i in range(POSTS_COUNT)
+        ]
+        Post.objects.bulk_create(
+            Post(author=author, group=group, text='Тестовый пост')
+            for author, group in zip(authors, groups)
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text='Тестовый пост')
+            for _ in range(POSTS_COUNT)
+        )
+        recount_posts_counters()
+        cls.post = Post.objects.filter(author=cls.author).first()
+
+    def setUp(self):
+        cache.clear()
+        # Группы загружаются в память процесса один раз.
+        get_groups()
+        self.guest_client = Client()
+
+    def test_pages_query_budget(self):
+        pages_budget = {
+            reverse('posts:index'): 2,
+            reverse('posts:index') + '?page=2': 2,
+            reverse('posts:group_list',
+                    kwargs={'slug': self.group.slug}): 2,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): 2,
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.id}): 2,
+        }
+        for address, budget in pages_budget.items():
+            with self.subTest(address=address):
+                with self.assertNumQueries(budget):
+                    response = self.guest_client.get(address)
+                self.assertEqual(response.status_code, 200)
+
+    def test_feeds_do_not_join_groups(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertFalse(any('posts_group' in query['sql']
+                             for query in queries.captured_queries))
+        for post in response.context['page_obj']:
+            with self.subTest(post=post.pk):
+                self.assertIsNotNone(post.group)
+
+    def test_group_cache_reloads_after_group_change(self):
+        client = Client()
+        client.force_login(self.author)
+        address = reverse('posts:group_list',
+                          kwargs={'slug': self.group.slug})
+        Group.objects.filter(pk=self.group.pk).update(title='Новое название')
+        response = client.get(address)
+        self.assertEqual(response.context['group'].title, 'Тестовая группа')
+        Group.objects.get(pk=self.group.pk).save()
+        response = client.get(address)
+        self.assertEqual(response.context['group'].title, 'Новое название')
+
+    def test_new_post_keeps_group_cache_and_updates_count(self):
+        version = get_feed_versions([GROUPS])
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Новый пост')
+        self.assertEqual(get_feed_versions([GROUPS]), version)
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}))
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         POSTS_COUNT + 1)
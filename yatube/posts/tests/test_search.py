@@ -0,0 +1,74 @@
+from django.contrib.admin.sites import site
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Post, get_user_model
+
+
+User = get_user_model()
+
+SEARCH = reverse('posts:search')
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.tolstoy = Post.objects.create(
+            author=cls.author, text='Лев Толстой — зеркало русской революции')
+        cls.pushkin = Post.objects.create(
+            author=cls.author, text='Пушкин — наше всё. <b>Толстой</b> тоже')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост про погоду {i}')
+            for i in range(12))
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        return self.guest_client.get(SEARCH, {'q': query, **params})
+
+    def test_search_finds_and_highlights_posts(self):
+        response = self.search('толстой')
+        posts = list(response.context['page_obj'])
+        self.assertEqual(set(posts), {self.tolstoy, self.pushkin})
+        self.assertContains(response, '<mark>Толстой</mark>')
+        self.assertContains(response, '&lt;b&gt;<mark>Толстой</mark>')
+
+    def test_search_ranks_better_matches_first(self):
+        response = self.search('русской революции')
+        self.assertEqual(list(response.context['page_obj']), [self.tolstoy])
+        response = self.search('толстой пушкин')
+        self.assertEqual(list(response.context['page_obj']), [self.pushkin])
+
+    def test_search_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(pk=self.tolstoy.pk)
+        post.text = 'Текст без классиков'
+        post.save()
+        Post.objects.get(pk=self.pushkin.pk).delete()
+        response = self.search('толстой')
+        self.assertEqual(list(response.context['page_obj']), [])
+        response = self.search('классик')
+        self.assertEqual(list(response.context['page_obj']), [self.tolstoy])
+
+    def test_search_is_paginated(self):
+        response = self.search('погоду', page=2)
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 12)
+        self.assertEqual(len(page_obj), 2)
+        self.assertContains(response, 'q=%D0%BF%D0%BE%D0%B3%D0%BE%D0%B4%D1%83'
+                                      '&page=1')
+
+    def test_fts_syntax_in_query_is_ignored(self):
+        response = self.search('"толстой* (')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_admin_search_uses_index(self):
+        admin = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/', {'q': 'толст'})
+        queryset, use_distinct = admin.get_search_results(
+            request, Post.objects.all(), 'толст')
+        self.assertEqual(set(queryset), {self.tolstoy, self.pushkin})
+        self.assertFalse(use_distinct)
@@ -1,8 +1,11 @@
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django import forms
 
+from posts.cache import get_groups
 from posts.models import Post, Group, get_user_model
+from posts.utils import WindowedPaginator
 
 
 User = get_user_model()
@@ -101,3 +104,83 @@ class PaginatorViewsTest(TestCase):
         response = self.authorized_client.get(
             reverse('posts:index') + '?page=2')
         self.assertEqual(len(response.context.get('page_obj').object_list), 5)
+
+
+class WindowedPaginatorTest(TestCase):
+    def test_elided_page_range(self):
+        paginator = WindowedPaginator(range(1000), 10)
+        ellipsis = paginator.ELLIPSIS
+        cases = {
+            1: [1, 2, 3, 4, ellipsis, 100],
+            50: [1, ellipsis, 47, 48, 49, 50, 51, 52, 53, ellipsis, 100],
+            100: [1, ellipsis, 97, 98, 99, 100],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(list(paginator.get_elided_page_range(
+                    number, on_each_side=3, on_ends=1)), expected)
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_feed_renders_window_of_pages(self):
+        author = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(Post(author=author, text='Тестовый пост')
+                                 for _ in range(30))
+        cache.clear()
+        response = self.client.get(MAIN_PAGE, {'page': 15})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.elided_page_range[0], 1)
+        self.assertEqual(page_obj.elided_page_range[-1], 30)
+        self.assertEqual(len(page_obj.elided_page_range), 11)
+        self.assertContains(response, '?page=30')
+        self.assertNotContains(response, '?page=20"')
+
+
+@override_settings(POSTS_CURSOR_PAGINATION=True)
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Тестовый пост {i}')
+            for i in range(25))
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True))
+
+    def setUp(self):
+        cache.clear()
+        get_groups()
+        self.guest_client = Client()
+
+    def get_page(self, cursor=None):
+        address = reverse('posts:index')
+        if cursor:
+            address += f'?cursor={cursor}'
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(address)
+        return response.context['page_obj']
+
+    def test_cursor_pages_cover_feed_in_order(self):
+        page_obj = self.get_page()
+        self.assertFalse(page_obj.has_previous())
+        seen = [post.pk for post in page_obj]
+        while page_obj.has_next():
+            page_obj = self.get_page(page_obj.next_cursor)
+            seen.extend(post.pk for post in page_obj)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(page_obj), 5)
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = self.get_page()
+        second = self.get_page(first.next_cursor)
+        third = self.get_page(second.next_cursor)
+        back = self.get_page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        back = self.get_page(back.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        page_obj = self.get_page('не-курсор')
+        self.assertEqual([post.pk for post in page_obj], self.expected[:10])
@@ -0,0 +1,109 @@
+from itertools import islice
+
+from django.conf import settings
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .utils import PREVIOUS, CursorPaginator
+
+
+def is_pulled(followers_count):
+    """Посты таких авторов читаются при показе ленты, а не раскладываются."""
+    return followers_count > settings.FANOUT_FOLLOWER_LIMIT
+
+
+def get_followers_count(author_id):
+    count = AuthorStats.objects.filter(author_id=author_id).values_list(
+        'followers_count', flat=True).first()
+    return count or 0
+
+
+def add_to_timelines(owner_ids, posts):
+    """Добавляет `posts` в ленты читателей `owner_ids` пачками."""
+    entries = (
+        TimelineEntry(owner_id=owner_id, post_id=post.pk,
+                      pub_date=post.pub_date)
+        for owner_id in owner_ids for post in posts
+    )
+    while True:
+        batch = list(islice(entries, settings.FANOUT_BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def recent_posts(author_id):
+    return list(Post.objects.filter(author_id=author_id).only(
+        'pk', 'pub_date').order_by('-pub_date')[:settings.TIMELINE_BACKFILL])
+
+
+def fan_out_post(post):
+    """Кладёт новый пост в ленты подписчиков автора."""
+    if is_pulled(get_followers_count(post.author_id)):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True)
+    add_to_timelines(followers.iterator(), [post])
+
+
+def follow_started(user_id, author_id):
+    """Переносит в ленту нового подписчика последние посты автора."""
+    if not is_pulled(get_followers_count(author_id)):
+        add_to_timelines([user_id], recent_posts(author_id))
+
+
+def follow_stopped(user_id, author_id):
+    TimelineEntry.objects.filter(owner_id=user_id,
+                                 post__author_id=author_id).delete()
+
+
+def fan_out_recent(author_id):
+    """Кладёт последние посты автора в ленты всех его подписчиков.
+
+    Нужно, когда автор снова раскладывает посты: те, что раньше
+    дочитывались, иначе не попадут в ленты. Уже разложенные посты
+    пропускаются, поэтому повторный вызов безопасен.
+    """
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True)
+    add_to_timelines(followers.iterator(), recent_posts(author_id))
+
+
+def pulled_authors(owner):
+    """Популярные авторы, на которых подписан `owner`.
+
+    Подписки читателя берутся по уникальному индексу `(user, author)`,
+    а число подписчиков каждого автора — по его строке `AuthorStats`.
+    """
+    return list(Follow.objects.filter(
+        user=owner,
+        author__post_stats__followers_count__gt=(
+            settings.FANOUT_FOLLOWER_LIMIT),
+    ).values_list('author_id', flat=True))
+
+
+class TimelinePaginator(CursorPaginator):
+    """Лента подписок: предвычисленная лента плюс популярные авторы.
+
+    Страница — запрос к ленте читателя и по запросу на каждого популярного
+    автора из подписок, все с одним курсором и лимитом, так что каждый
+    читает не больше страницы по индексу `(author, pub_date)`.
+    Результаты сливаются по `(pub_date, id)`, поэтому стоимость страницы
+    зависит от её размера и числа популярных подписок, а не от числа постов.
+    """
+
+    def fetch(self, owner, position, limit):
+        entries = super().fetch(
+            TimelineEntry.objects.filter(owner=owner).select_related(
+                'post__author', 'post__group'),
+            position, limit, key='post_id')
+        posts = {entry.post.pk: entry.post for entry in entries}
+        for author_id in pulled_authors(owner):
+            pulled = super().fetch(
+                Post.objects.filter(author_id=author_id).select_related(
+                    'author', 'group'),
+                position, limit)
+            posts.update((post.pk, post) for post in pulled)
+        backwards = position is not None and position[0] == PREVIOUS
+        return sorted(posts.values(),
+                      key=lambda post: (post.pub_date, post.pk),
+                      reverse=not backwards)[:limit]
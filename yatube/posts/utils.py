@@ -1,10 +1,194 @@
+import base64
+import binascii
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class CursorPage:
+    """Страница курсорной пагинации.
+
+    Повторяет ту часть интерфейса `Page`, которая нужна шаблону
+    `includes/paginator.html`, но вместо номеров страниц отдаёт курсоры.
+    """
+    keyset = True
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по `(pub_date, id)` без COUNT(*) и OFFSET.
+
+    Каждая страница выбирается одним запросом вида
+    `WHERE (pub_date, id) < (...) ORDER BY pub_date DESC, id DESC LIMIT n`,
+    поэтому её стоимость не зависит от того, как далеко листает читатель.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    @staticmethod
+    def encode_cursor(direction, pub_date, pk):
+        value = f'{direction}|{pub_date.isoformat()}|{pk}'
+        token = base64.urlsafe_b64encode(value.encode())
+        return token.decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Возвращает `(direction, pub_date, pk)` или None."""
+        if not cursor:
+            return None
+        try:
+            value = base64.urlsafe_b64decode(
+                cursor + '=' * (-len(cursor) % 4)).decode()
+            direction, pub_date, pk = value.split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        if direction not in (NEXT, PREVIOUS) or pub_date is None:
+            return None
+        return direction, pub_date, pk
+
+    def fetch(self, queryset, position, limit, key='pk'):
+        """Выбирает до `limit` объектов после курсора в порядке курсора.
+
+        `key` — поле с id поста, если в `queryset` не сами посты.
+        """
+        if position is None:
+            return list(queryset.order_by('-pub_date', f'-{key}')[:limit])
+        direction, pub_date, pk = position
+        if direction == NEXT:
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, **{f'{key}__lt': pk})
+            ).order_by('-pub_date', f'-{key}')
+        else:
+            queryset = queryset.filter(
+                Q(pub_date__gt=pub_date)
+                | Q(pub_date=pub_date, **{f'{key}__gt': pk})
+            ).order_by('pub_date', key)
+        return list(queryset[:limit])
+
+    def cursor_for(self, direction, post):
+        return self.encode_cursor(direction, post.pub_date, post.pk)
+
+    def get_page(self, cursor=None):
+        position = self.decode_cursor(cursor)
+        items = self.fetch(self.object_list, position, self.per_page + 1)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if position is None:
+            if not has_more:
+                return CursorPage(items, self)
+            return CursorPage(items, self,
+                              next_cursor=self.cursor_for(NEXT, items[-1]))
+        if position[0] == PREVIOUS:
+            if len(items) < self.per_page:
+                # Дошли до начала ленты: показываем полную первую страницу.
+                return self.get_page()
+            items.reverse()
+            return CursorPage(
+                items, self,
+                next_cursor=self.cursor_for(NEXT, items[-1]),
+                previous_cursor=(self.cursor_for(PREVIOUS, items[0])
+                                 if has_more else None),
+            )
+        if not items:
+            previous_cursor = self.encode_cursor(PREVIOUS, *position[1:])
+            return CursorPage(items, self, previous_cursor=previous_cursor)
+        return CursorPage(
+            items, self,
+            next_cursor=self.cursor_for(NEXT, items[-1]) if has_more else None,
+            previous_cursor=self.cursor_for(PREVIOUS, items[0]),
+        )
+
+
+class WindowedPaginator(Paginator):
+    """Paginator с укороченным списком номеров страниц.
+
+    `get_elided_page_range` перенесён из Django 3.2: вместо всех страниц
+    отдаёт крайние, `on_each_side` соседних с текущей и `ELLIPSIS` между
+    ними, так что размер навигации не зависит от длины ленты.
+    """
+    ELLIPSIS = '…'
+
+    def get_elided_page_range(self, number=1, *, on_each_side=3, on_ends=2):
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1,
+                             self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
 
-from yatube.settings import POSTS_PER_PAGE
 
+def get_paginator(request, items_list, cursor=None, count=None):
+    """Страница ленты: по номеру `?page=` или по курсору `?cursor=`.
 
-def get_paginator(request, items_list):
-    paginator = Paginator(items_list, POSTS_PER_PAGE)
+    Курсорный режим включается аргументом `cursor` или настройкой
+    `POSTS_CURSOR_PAGINATION`. Известное заранее число объектов `count`
+    избавляет пагинатор от запроса COUNT(*). Если `count` — функция, она
+    вызывается только для постраничного режима; None от неё означает
+    точный подсчёт.
+    """
+    if cursor is None:
+        cursor = getattr(settings, 'POSTS_CURSOR_PAGINATION', False)
+    if cursor:
+        paginator = CursorPaginator(items_list, settings.POSTS_PER_PAGE)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = WindowedPaginator(items_list, settings.POSTS_PER_PAGE)
+    if callable(count):
+        count = count()
+    if count is not None:
+        paginator.count = count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.elided_page_range = list(paginator.get_elided_page_range(
+        page_obj.number,
+        on_each_side=settings.POSTS_PAGE_RANGE_ON_EACH_SIDE,
+        on_ends=settings.POSTS_PAGE_RANGE_ON_ENDS,
+    ))
     return page_obj
@@ -1,24 +1,47 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
-from .models import Group, Post, User
+from core.routers import is_pinned, use_replica
+
+from .cache import (attach_groups, author_feed, cache_feed,
+                    get_group_or_404, group_feed, index_feed)
+from .conditional import feed_condition, post_condition
+from .counters import (get_author_posts_count, get_group_posts_count,
+                       get_total_posts_count)
+from .export import export_posts
+from .models import Follow, Post, User
 from .forms import PostForm
+from .search import search_posts
+from .timeline import TimelinePaginator
 from .utils import get_paginator
 
 
+@use_replica
+@feed_condition(index_feed)
+@cache_feed(index_feed)
 def index(request):
-    post_list = Post.objects.all().order_by('-pub_date')
-    page_obj = get_paginator(request, post_list)
+    post_list = Post.objects.select_related('author')
+    page_obj = get_paginator(request, post_list,
+                             count=get_total_posts_count)
+    attach_groups(page_obj)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@use_replica
+@feed_condition(group_feed)
+@cache_feed(group_feed)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = get_paginator(request, post_list)
+    group = get_group_or_404(slug)
+    post_list = group.posts.select_related('author')
+    page_obj = get_paginator(request, post_list,
+                             count=get_group_posts_count(group))
+    attach_groups(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -26,28 +49,61 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@use_replica
+@feed_condition(author_feed)
+@cache_feed(author_feed)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = get_paginator(request, post_list)
+    author = get_object_or_404(User.objects.select_related('post_stats'),
+                               username=username)
+    posts_count = get_author_posts_count(author)
+    if is_pinned():
+        # Счётчик обновляется в фоне: кто только что писал, видит
+        # точное число.
+        posts_count = author.posts.count()
+    post_list = author.posts.select_related('author')
+    page_obj = get_paginator(request, post_list, count=posts_count)
+    attach_groups(page_obj)
+    following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
     context = {
         'author': author,
         'page_obj': page_obj,
+        'posts_count': posts_count,
+        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@use_replica
+@post_condition
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__post_stats'), pk=post_id)
+    attach_groups([post])
     context = {
         'post': post,
+        'posts_count': get_author_posts_count(post.author),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = get_paginator(request, search_posts(query), cursor=False)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     context = {
         'form': form,
         'username': request.user,
@@ -82,3 +138,56 @@ def post_edit(request, post_id):
         'post': post,
     }
     return render(request, 'posts/post_create.html', context)
+
+
+@staff_member_required
+def export(request):
+    export_format = request.GET.get('format', 'jsonl')
+    compress = 'gzip' in request.GET
+    try:
+        chunks = export_posts(
+            export_format, compress,
+            author=request.GET.get('author'),
+            group=request.GET.get('group'),
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    filename = f'posts.{export_format}'
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    elif export_format == 'csv':
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        content_type = 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def follow_index(request):
+    paginator = TimelinePaginator(request.user, settings.POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+def profile_unfollow(request, username):
+    follow = Follow.objects.filter(user=request.user,
+                                   author__username=username)
+    follow.delete()
+    return redirect('posts:profile', username=username)
@@ -0,0 +1,10 @@
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import ASGIBridge
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = ASGIBridge(get_wsgi_application(), settings.ASGI_THREADS)
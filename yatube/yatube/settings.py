@@ -40,7 +40,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
+    'core.middleware.QueryInspectorMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -51,6 +56,20 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+# Доля запросов, для которых RequestTimingMiddleware замеряет время SQL
+# и шаблонов (0 — выключено, 1 — все запросы).
+REQUEST_TIMING_SAMPLE_RATE = 0.1
+# Сколько самых медленных SQL-запросов писать в лог `yatube.requests`.
+REQUEST_TIMING_SLOWEST_QUERIES = 3
+
+# QueryInspectorMiddleware пишет в лог `yatube.sql` запросы дольше
+# SLOW_QUERY_THRESHOLD_MS и SQL, повторённый за один запрос
+# DUPLICATE_QUERY_THRESHOLD раз и больше (признак N+1). Проверяется
+# доля SLOW_QUERY_SAMPLE_RATE запросов: обёртка каждого SQL не бесплатна.
+SLOW_QUERY_SAMPLE_RATE = 0.01
+SLOW_QUERY_THRESHOLD_MS = 100
+DUPLICATE_QUERY_THRESHOLD = 5
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
@@ -70,6 +89,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Сколько запросов одновременно выполняет Django за ASGI-входом
+# (yatube.asgi). Медленные клиенты потоков не занимают.
+ASGI_THREADS = 16
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -81,6 +104,52 @@ DATABASES = {
     }
 }
 
+# Применяются к каждому соединению с SQLite (см. core.db). WAL позволяет
+# читать во время записи, busy_timeout (мс) ждёт блокировку вместо
+# ошибки `database is locked`, cache_size < 0 задаётся в КиБ.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Реплика для чтения лент (см. core.routers). Локально это второй файл
+# SQLite, который обновляется командой `sync_replica`.
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_DATABASE = os.environ.get('YATUBE_REPLICA_DB')
+if REPLICA_DATABASE:
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPLICA_DATABASE,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Модели, которые можно читать с реплики.
+REPLICA_MODELS = ('posts.Post', 'posts.Group', 'posts.AuthorStats',
+                  'auth.User')
+
+# Сколько секунд после записи клиент читает только с основной базы.
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Сколько секунд хранить страницы лент для анонимных посетителей.
+FEED_CACHE_TIMEOUT = 60 * 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -122,7 +191,56 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+# collectstatic пишет сюда файлы с хэшем содержимого в имени и их сжатые
+# копии; StaticFilesMiddleware отдаёт их с кэшированием навсегда.
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+STATIC_COMPRESS_EXTENSIONS = ('css', 'js', 'svg', 'json', 'map', 'txt',
+                              'xml', 'html', 'ico')
+# Файлы меньше этого размера (байт) не сжимаются.
+STATIC_COMPRESS_MIN_SIZE = 256
+# Сколько секунд кэшировать файлы без хэша в имени.
+STATIC_MAX_AGE = 60
+
+# Сжатие ответов (см. core.middleware.CompressionMiddleware).
+COMPRESSION_CONTENT_TYPES = ('text/html', 'text/plain', 'text/css',
+                             'text/csv', 'application/json',
+                             'application/x-ndjson',
+                             'application/javascript')
+# Ответы короче этого размера (байт) не сжимаются.
+COMPRESSION_MIN_SIZE = 512
+# Уровни для динамических ответов: brotli 11 слишком медленный.
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 5}
+
 POSTS_PER_PAGE = 10
+# Листать ленты по курсору `?cursor=` вместо номера страницы `?page=`.
+POSTS_CURSOR_PAGINATION = False
+# Сколько номеров страниц показывать по краям навигации и рядом с текущей.
+POSTS_PAGE_RANGE_ON_ENDS = 1
+POSTS_PAGE_RANGE_ON_EACH_SIDE = 3
+# Число всех постов для пагинатора главной берётся из кэша и
+# пересчитывается в фоне, если старше стольких секунд.
+POSTS_COUNT_MAX_AGE = 60
+# Если постов меньше, главная считает их точно, без кэша.
+POSTS_EXACT_COUNT_BELOW = 10000
+
+# Авторы, у которых подписчиков больше этого числа, не раскладывают
+# посты по лентам подписок: их посты дочитываются при показе ленты.
+FANOUT_FOLLOWER_LIMIT = 1000
+# Сколько записей ленты вставлять за один запрос.
+FANOUT_BATCH_SIZE = 500
+# Сколько последних постов автора попадает в ленту нового подписчика.
+TIMELINE_BACKFILL = 50
+
+# Фоновые задачи (см. core.tasks). При TASKS_EAGER задачи выполняются
+# сразу в текущем потоке, без очереди.
+TASKS_EAGER = False
+TASKS_WORKERS = 2
+TASKS_RETRIES = 3
+# Задержка перед повтором, с, удваивается с каждой попыткой.
+TASKS_RETRY_BACKOFF = 0.5
+# С какой длины очереди писать предупреждение в лог `yatube.tasks`.
+TASKS_QUEUE_WARNING_DEPTH = 1000
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -133,3 +251,10 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Миниатюры картинок постов: размер -> (геометрия, параметры sorl).
+# Все они создаются в фоне сразу после загрузки картинки.
+THUMBNAIL_SIZES = {
+    'article': ('960x339', {'crop': 'center', 'upscale': True}),
+    'detail': ('960', {'upscale': False}),
+}